@@ -0,0 +1,61 @@
+"""
+Rebuild the referral_closure table from users.referred_by_code, and the
+team counters (user_team_counts) derived from it.
+
+    python -m app.commands.backfill_referral_closure
+
+Migration 0004 fills the table and signups keep it current, so this is
+only needed for repairs (e.g. after editing referred_by_code by hand).
+
+Safe to re-run: both tables are truncated and rebuilt in one transaction,
+and signups that happen meanwhile wait for it and then add their own rows.
+Cycles in referred_by_code (which should not exist) are cut, not followed.
+"""
+import asyncio
+
+from sqlalchemy import text
+
+from app.database import engine
+
+REBUILD_CLOSURE = text("""
+    INSERT INTO referral_closure (ancestor_id, descendant_id, depth)
+    WITH RECURSIVE chain AS (
+        SELECT u.id AS descendant_id, u.id AS ancestor_id, 0 AS depth,
+               u.referred_by_code AS next_code, ARRAY[u.id] AS path
+        FROM users u
+        UNION ALL
+        SELECT c.descendant_id, p.id, c.depth + 1, p.referred_by_code, c.path || p.id
+        FROM chain c
+        JOIN users p ON p.referral_code = c.next_code
+        WHERE NOT p.id = ANY(c.path)
+    )
+    SELECT ancestor_id, descendant_id, depth FROM chain
+""")
+
+REBUILD_TEAM_COUNTS = text("""
+    INSERT INTO user_team_counts (user_id, shard, direct_referrals, total_team_size)
+    SELECT ancestor_id, 0,
+           COUNT(*) FILTER (WHERE depth = 1),
+           COUNT(*) FILTER (WHERE depth >= 1)
+    FROM referral_closure
+    WHERE depth >= 1
+    GROUP BY ancestor_id
+""")
+
+
+async def backfill() -> tuple[int, int]:
+    async with engine.begin() as conn:
+        await conn.execute(text("TRUNCATE referral_closure, user_team_counts"))
+        inserted = (await conn.execute(REBUILD_CLOSURE)).rowcount
+        counted = (await conn.execute(REBUILD_TEAM_COUNTS)).rowcount
+    await engine.dispose()
+    return inserted, counted
+
+
+def main():
+    inserted, counted = asyncio.run(backfill())
+    print(f"✅ referral_closure rebuilt with {inserted} rows, team counters for {counted} users")
+
+
+if __name__ == "__main__":
+    main()
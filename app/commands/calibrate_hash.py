@@ -0,0 +1,62 @@
+"""
+Benchmark bcrypt cost factors on this host and pick the highest one that
+stays under a latency budget.
+
+    python -m app.commands.calibrate_hash --target-ms 250
+
+Put the printed BCRYPT_ROUNDS into the environment; existing hashes with a
+lower cost are upgraded transparently on the user's next login.
+"""
+import argparse
+import statistics
+import time
+
+from passlib.context import CryptContext
+
+
+def measure(rounds: int, samples: int) -> float:
+    """Median wall-clock milliseconds for one bcrypt hash at ``rounds``."""
+    context = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash("calibration-password")
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, min_rounds: int, max_rounds: int, samples: int) -> tuple[int, list[tuple[int, float]]]:
+    results = []
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        elapsed = measure(rounds, samples)
+        results.append((rounds, elapsed))
+        if elapsed > target_ms:
+            # Each extra round doubles the cost, no point going further
+            break
+        chosen = rounds
+    return chosen, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=250.0, help="latency budget for one hash")
+    parser.add_argument("--min-rounds", type=int, default=10, help="never recommend less than this")
+    parser.add_argument("--max-rounds", type=int, default=16)
+    parser.add_argument("--samples", type=int, default=5, help="hashes timed per cost factor")
+    args = parser.parse_args()
+
+    chosen, results = calibrate(args.target_ms, args.min_rounds, args.max_rounds, args.samples)
+
+    print(f"{'rounds':>6}  {'median ms':>10}")
+    for rounds, elapsed in results:
+        marker = "  <- chosen" if rounds == chosen else ""
+        print(f"{rounds:>6}  {elapsed:>10.1f}{marker}")
+
+    if results and results[0][1] > args.target_ms:
+        print(f"\n⚠️ Even {args.min_rounds} rounds exceed {args.target_ms} ms on this host")
+    print(f"\nBCRYPT_ROUNDS={chosen}")
+
+
+if __name__ == "__main__":
+    main()
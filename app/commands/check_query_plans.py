@@ -0,0 +1,173 @@
+"""
+EXPLAIN every hot query and fail if any of them would sequentially scan a
+large table.
+
+    python -m app.commands.check_query_plans
+
+Sequential scans are disabled for the check (``enable_seqscan = off``), so
+the planner only falls back to one when no usable index exists. That makes
+the result independent of how much data the target database holds. Exits
+with status 1 when a query regresses.
+"""
+import asyncio
+import json
+import sys
+from uuid import UUID
+
+from sqlalchemy import text
+
+from app.database import engine
+
+SAMPLE_ID = UUID("00000000-0000-0000-0000-000000000000")
+
+# (name, statement, params). Keep in sync with the services.
+HOT_QUERIES = [
+    (
+        "login: user by email",
+        "SELECT * FROM users WHERE email = :email LIMIT 1",
+        {"email": "someone@example.com"},
+    ),
+    (
+        "registration: email or username taken",
+        "SELECT 1 FROM users WHERE email = :email OR username = :username LIMIT 1",
+        {"email": "someone@example.com", "username": "someone"},
+    ),
+    (
+        "registration: pending by email",
+        "SELECT 1 FROM pending_registrations WHERE email = :email LIMIT 1",
+        {"email": "someone@example.com"},
+    ),
+    (
+        "bonus: referrer by code",
+        "SELECT id, referred_by_code FROM users WHERE referral_code = :code LIMIT 1",
+        {"code": "ABCDEFGH"},
+    ),
+    (
+        "team: direct referrals",
+        "SELECT COUNT(*) FROM users WHERE referred_by_code = :code",
+        {"code": "ABCDEFGH"},
+    ),
+    (
+        "team: children page",
+        "SELECT id, username FROM users WHERE referred_by_code = :code AND username > :after ORDER BY username LIMIT 51",
+        {"code": "ABCDEFGH", "after": "a"},
+    ),
+    (
+        "bonus: upline from closure",
+        "SELECT ancestor_id, depth FROM referral_closure WHERE descendant_id = :uid AND depth BETWEEN 1 AND 6",
+        {"uid": SAMPLE_ID},
+    ),
+    (
+        "team: downline from closure",
+        "SELECT descendant_id, depth FROM referral_closure WHERE ancestor_id = :uid AND depth >= 1",
+        {"uid": SAMPLE_ID},
+    ),
+    (
+        "ledger: latest entry",
+        "SELECT balance_after_minor, lifetime_earnings_minor FROM ledger_entries WHERE user_id = :uid ORDER BY id DESC LIMIT 1",
+        {"uid": SAMPLE_ID},
+    ),
+    (
+        "ledger: unfolded hot-account credits",
+        "SELECT COALESCE(SUM(amount_minor), 0) FROM pending_credits WHERE user_id = :uid",
+        {"uid": SAMPLE_ID},
+    ),
+    (
+        "hot accounts: fold shard",
+        "SELECT id FROM pending_credits WHERE shard = :shard ORDER BY id LIMIT 5000",
+        {"shard": 0},
+    ),
+    (
+        "user transactions page",
+        "SELECT * FROM transactions WHERE user_id = :uid ORDER BY created_at DESC LIMIT 20 OFFSET 0",
+        {"uid": SAMPLE_ID},
+    ),
+    (
+        "user withdrawals",
+        "SELECT * FROM withdrawals WHERE user_id = :uid ORDER BY requested_at DESC",
+        {"uid": SAMPLE_ID},
+    ),
+    (
+        "kyc status",
+        "SELECT status FROM kyc WHERE user_id = :uid ORDER BY submitted_at DESC LIMIT 1",
+        {"uid": SAMPLE_ID},
+    ),
+    (
+        "admin: pending withdrawals",
+        "SELECT * FROM withdrawals WHERE status = 'pending' ORDER BY requested_at DESC LIMIT 50",
+        {},
+    ),
+    (
+        "admin: pending kyc",
+        "SELECT * FROM kyc WHERE status = 'pending' ORDER BY submitted_at DESC LIMIT 50",
+        {},
+    ),
+    (
+        "admin: users page after cursor",
+        "SELECT * FROM users WHERE (created_at, id) < (now(), :uid) "
+        "ORDER BY created_at DESC, id DESC LIMIT 51",
+        {"uid": SAMPLE_ID},
+    ),
+    (
+        "admin: users by referrer after cursor",
+        "SELECT * FROM users WHERE referred_by_code = :code AND (created_at, id) < (now(), :uid) "
+        "ORDER BY created_at DESC, id DESC LIMIT 51",
+        {"code": "ABCDEFGH", "uid": SAMPLE_ID},
+    ),
+    (
+        "admin: transactions by type after cursor",
+        "SELECT * FROM transactions WHERE type = 'referral_bonus' AND (created_at, id) < (now(), :uid) "
+        "ORDER BY created_at DESC, id DESC LIMIT 51",
+        {"uid": SAMPLE_ID},
+    ),
+    (
+        "admin: withdrawals by status after cursor",
+        "SELECT * FROM withdrawals WHERE status = 'pending' AND (requested_at, id) < (now(), :uid) "
+        "ORDER BY requested_at DESC, id DESC LIMIT 51",
+        {"uid": SAMPLE_ID},
+    ),
+]
+
+# Tables where a seq scan is expected
+SEQ_SCAN_ALLOWED = {"alembic_version"}
+
+
+def find_seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") not in SEQ_SCAN_ALLOWED:
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(find_seq_scans(child))
+    return found
+
+
+async def check() -> int:
+    failures = 0
+    async with engine.connect() as conn:
+        for name, statement, params in HOT_QUERIES:
+            async with conn.begin() as tx:
+                await conn.execute(text("SET LOCAL enable_seqscan = off"))
+                result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {statement}"), params)
+                raw = result.scalar()
+                await tx.rollback()
+
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+            seq_scans = find_seq_scans(plan)
+            if seq_scans:
+                failures += 1
+                print(f"❌ {name}: sequential scan on {', '.join(seq_scans)}")
+            else:
+                print(f"✅ {name}")
+    await engine.dispose()
+    return failures
+
+
+def main():
+    failures = asyncio.run(check())
+    if failures:
+        print(f"\n{failures} hot quer{'y' if failures == 1 else 'ies'} without a usable index")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
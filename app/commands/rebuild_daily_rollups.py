@@ -0,0 +1,101 @@
+"""
+Recompute daily_rollups for a range of days from the raw users,
+transactions and withdrawals rows.
+
+    python -m app.commands.rebuild_daily_rollups --from 2026-01-01 --to 2026-10-17
+    python -m app.commands.rebuild_daily_rollups --from 2026-10-17   # one day
+
+Days are UTC. Each day is rebuilt in its own transaction under an
+exclusive advisory lock on that day, which the live upserts take in shared
+mode for the days they write: the day's rows are deleted and the totals
+written back into shard 0. Writes to the day being rebuilt wait for it and
+then add themselves on top; writes to every other day are never held up.
+Safe to run on a live database, including for today.
+"""
+import argparse
+import asyncio
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.services.rollup_service import (
+    DEFAULT_CURRENCY,
+    NO_CURRENCY,
+    SIGNUP,
+    TRANSACTION_METRICS,
+    WITHDRAWAL_REQUEST,
+    day_lock_key,
+)
+
+REBUILD_DAY = text("""
+    INSERT INTO daily_rollups (day, metric, currency, shard, count, amount_minor)
+    SELECT CAST(:day AS date), metric, currency, 0, COUNT(*), COALESCE(SUM(amount_minor), 0)
+    FROM (
+        SELECT CAST(:signup AS text) AS metric, CAST(:no_currency AS text) AS currency, 0::bigint AS amount_minor
+        FROM users
+        WHERE created_at >= :start AND created_at < :end
+        UNION ALL
+        SELECT m.metric, lower(COALESCE(t.currency, :default_currency)), ROUND(t.amount * 100)::bigint
+        FROM transactions t
+        JOIN unnest(CAST(:types AS text[]), CAST(:metrics AS text[])) AS m (type, metric) ON m.type = t.type
+        WHERE t.status = 'completed' AND t.created_at >= :start AND t.created_at < :end
+        UNION ALL
+        SELECT CAST(:withdrawal_request AS text), lower(COALESCE(w.currency, :default_currency)),
+               ROUND(w.amount * 100)::bigint
+        FROM withdrawals w
+        WHERE w.requested_at >= :start AND w.requested_at < :end
+    ) r
+    GROUP BY metric, currency
+""")
+
+
+async def rebuild_day(day: date) -> int:
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    async with engine.begin() as conn:
+        # Waits for in-flight upserts to this day and holds off new ones until
+        # commit; upserts to other days take other keys and never wait
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext('daily_rollups'), :day_key)"),
+            {"day_key": day_lock_key(day)},
+        )
+        await conn.execute(text("DELETE FROM daily_rollups WHERE day = :day"), {"day": day})
+        result = await conn.execute(REBUILD_DAY, {
+            "day": day,
+            "start": start,
+            "end": start + timedelta(days=1),
+            "signup": SIGNUP,
+            "no_currency": NO_CURRENCY,
+            "types": list(TRANSACTION_METRICS),
+            "metrics": list(TRANSACTION_METRICS.values()),
+            "withdrawal_request": WITHDRAWAL_REQUEST,
+            "default_currency": DEFAULT_CURRENCY,
+        })
+        return result.rowcount
+
+
+async def rebuild(date_from: date, date_to: date) -> None:
+    day = date_from
+    while day <= date_to:
+        rows = await rebuild_day(day)
+        print(f"  {day}: {rows} rollup rows")
+        day += timedelta(days=1)
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, required=True, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="last day, inclusive (default: --from)")
+    args = parser.parse_args()
+
+    date_to = args.date_to or args.date_from
+    if date_to < args.date_from:
+        parser.error("--to is before --from")
+
+    asyncio.run(rebuild(args.date_from, date_to))
+    print(f"✅ daily_rollups rebuilt for {args.date_from} .. {date_to}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Offline referral payout engine. Loads the referral graph into NumPy arrays
+and computes the signup bonuses of every signup in a few vectorized passes
+(one per tier), then diffs them against what the transactions table
+actually paid.
+
+    python -m app.commands.simulate_payouts                     # audit the full history
+    python -m app.commands.simulate_payouts --signups 10000     # latest 10k signups only
+    python -m app.commands.simulate_payouts --schedule 0.12,0.08,0.06,0.04,0.02,0.01
+    python -m app.commands.simulate_payouts --schedule reduction-factors
+    python -m app.commands.simulate_payouts --synthetic 100000  # hypothetical signups, no diff
+
+With the live schedule a clean audit reports no differences; with any
+other schedule the diff is the "what if" impact per account. Read-only.
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+from app.utils.common import (
+    REFERRAL_REDUCTION_FACTORS,
+    SIGNUP_BONUS_PERCENTAGES,
+    SIGNUP_FEE,
+    to_minor_units,
+)
+
+LEFTOVER_NOTE_PREFIX = "Leftover from signup of "
+
+
+# -----------------------------
+# Graph
+# -----------------------------
+class ReferralGraph:
+    """Users as array positions; ``parent[i]`` is the referrer's position or -1."""
+
+    def __init__(self, ids: np.ndarray, parent: np.ndarray, has_referrer_code: np.ndarray, master: int):
+        self.ids = ids
+        self.parent = parent
+        self.has_referrer_code = has_referrer_code
+        self.master = master
+        self.index = {user_id: i for i, user_id in enumerate(ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+
+async def load_graph(conn) -> ReferralGraph:
+    result = await conn.execute(text("""
+        SELECT id, referral_code, referred_by_code
+        FROM users
+        ORDER BY created_at NULLS FIRST, id
+    """))
+    rows = result.fetchall()
+
+    ids = np.array([str(r.id) for r in rows], dtype=object)
+    codes = np.array([r.referral_code or "" for r in rows], dtype=str)
+    referred_by = np.array([r.referred_by_code or "" for r in rows], dtype=str)
+
+    # Resolve referred_by_code -> position with one sorted search
+    has_code = referred_by != ""
+    parent = np.full(len(codes), -1, dtype=np.int64)
+    if len(codes):
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        pos = np.minimum(np.searchsorted(sorted_codes, referred_by), len(codes) - 1)
+        found = has_code & (sorted_codes[pos] == referred_by)
+        parent[found] = order[pos[found]]
+
+    master_hits = np.flatnonzero(codes == settings.MASTER_REFERRAL_CODE)
+    master = int(master_hits[0]) if len(master_hits) else -1
+    return ReferralGraph(ids, parent, has_code, master)
+
+
+# -----------------------------
+# Engine
+# -----------------------------
+def upline_matrix(parent: np.ndarray, referrers: np.ndarray, tiers: int) -> np.ndarray:
+    """(signups, tiers) positions of each signup's upline, -1 past the root."""
+    upline = np.full((len(referrers), tiers), -1, dtype=np.int64)
+    current = referrers
+    for tier in range(tiers):
+        upline[:, tier] = current
+        current = np.where(current >= 0, parent[np.maximum(current, 0)], -1)
+    return upline
+
+
+def tier_bonus_cents(fee, percentages) -> list[int]:
+    # Same float rounding as distribute_signup_bonus
+    return [to_minor_units(round(fee * p, 2)) for p in percentages]
+
+
+def compute_payouts(graph: ReferralGraph, referrers: np.ndarray, fee, percentages) -> dict:
+    """
+    Bonuses for signups whose referrer sits at ``referrers`` (-1 when the
+    referral code didn't resolve: the whole fee then goes to MASTERKEY).
+    """
+    tiers = len(percentages)
+    upline = upline_matrix(graph.parent, referrers, tiers)
+    present = upline >= 0
+
+    bonus = np.where(present, np.array(tier_bonus_cents(fee, percentages), dtype=np.int64), 0)
+    leftover = to_minor_units(fee) - bonus.sum(axis=1)
+    leftover = np.where(leftover > 0, leftover, 0) if graph.master >= 0 else np.zeros_like(leftover)
+
+    bonus_by_user = np.bincount(upline[present], weights=bonus[present], minlength=len(graph))
+    leftover_by_user = np.zeros(len(graph), dtype=np.int64)
+    if graph.master >= 0:
+        leftover_by_user[graph.master] = leftover.sum()
+
+    return {
+        "signups": len(referrers),
+        "bonus_by_user": np.rint(bonus_by_user).astype(np.int64),
+        "leftover_by_user": leftover_by_user,
+        "tier_totals": bonus.sum(axis=0),
+        "paid_tiers": present.sum(axis=0),
+    }
+
+
+# -----------------------------
+# Actual payouts
+# -----------------------------
+async def load_actual(conn, graph: ReferralGraph, signup_ids: list[str] | None) -> tuple[np.ndarray, np.ndarray, int]:
+    """Paid referral bonuses and MASTERKEY leftovers per user position (cents)."""
+    params = {}
+    bonus_filter = ""
+    leftover_filter = "AND note LIKE :prefix"
+    params["prefix"] = f"{LEFTOVER_NOTE_PREFIX}%"
+    if signup_ids is not None:
+        bonus_filter = "AND referee_id = ANY(CAST(:ids AS uuid[]))"
+        leftover_filter = "AND note = ANY(:notes)"
+        params["ids"] = signup_ids
+        params["notes"] = [f"{LEFTOVER_NOTE_PREFIX}{i}" for i in signup_ids]
+
+    result = await conn.execute(
+        text(f"""
+            SELECT user_id, 'referral_bonus' AS kind, SUM(amount) AS total
+            FROM transactions
+            WHERE type = 'referral_bonus' {bonus_filter}
+            GROUP BY user_id
+            UNION ALL
+            SELECT user_id, 'leftover' AS kind, SUM(amount) AS total
+            FROM transactions
+            WHERE type = 'admin_credit' {leftover_filter}
+            GROUP BY user_id
+        """),
+        params,
+    )
+
+    bonus = np.zeros(len(graph), dtype=np.int64)
+    leftover = np.zeros(len(graph), dtype=np.int64)
+    unknown = 0
+    for r in result.fetchall():
+        i = graph.index.get(str(r.user_id))
+        if i is None:
+            unknown += to_minor_units(r.total)
+            continue
+        (bonus if r.kind == "referral_bonus" else leftover)[i] += to_minor_units(r.total)
+    return bonus, leftover, unknown
+
+
+# -----------------------------
+# Report
+# -----------------------------
+def fmt(cents) -> str:
+    return f"{int(cents) / 100:,.2f}"
+
+
+def print_payouts(payouts: dict, percentages):
+    print(f"Signups: {payouts['signups']:,}")
+    for tier, (p, total, paid) in enumerate(zip(percentages, payouts["tier_totals"], payouts["paid_tiers"]), start=1):
+        print(f"  tier {tier} ({p:.4%}): {fmt(total):>16}  over {int(paid):,} signups")
+    print(f"  referral bonuses: {fmt(payouts['bonus_by_user'].sum()):>16}")
+    print(f"  MASTERKEY leftover: {fmt(payouts['leftover_by_user'].sum()):>14}")
+
+
+def print_diff(graph: ReferralGraph, payouts: dict, actual_bonus, actual_leftover, unknown: int, top: int):
+    delta = (payouts["bonus_by_user"] + payouts["leftover_by_user"]) - (actual_bonus + actual_leftover)
+    changed = np.flatnonzero(delta)
+
+    print(f"\nPaid (transactions): bonuses {fmt(actual_bonus.sum())}, leftover {fmt(actual_leftover.sum())}")
+    if unknown:
+        print(f"  ⚠️ {fmt(unknown)} paid to user ids no longer in users")
+    print(f"Simulated - paid: {fmt(delta.sum())} across {len(changed):,} accounts")
+    if not len(changed):
+        print("✅ Simulation matches the transactions table")
+        return
+
+    for i in changed[np.argsort(-np.abs(delta[changed]), kind="stable")][:top]:
+        print(
+            f"  {graph.ids[i]}  simulated {fmt(payouts['bonus_by_user'][i] + payouts['leftover_by_user'][i]):>12}"
+            f"  paid {fmt(actual_bonus[i] + actual_leftover[i]):>12}  delta {fmt(delta[i]):>12}"
+        )
+
+
+def parse_schedule(value: str) -> list[float]:
+    if value == "live":
+        return list(SIGNUP_BONUS_PERCENTAGES)
+    if value == "reduction-factors":
+        # The calculate_tier_bonus schedule: 20% at tier 1, reduced per tier
+        return [0.20 * factor for factor in REFERRAL_REDUCTION_FACTORS]
+    return [float(p) for p in value.split(",")]
+
+
+async def run(args) -> None:
+    percentages = parse_schedule(args.schedule)
+
+    async with engine.connect() as conn:
+        started = time.perf_counter()
+        graph = await load_graph(conn)
+        print(f"Loaded {len(graph):,} users in {time.perf_counter() - started:.2f}s")
+
+        if args.synthetic:
+            rng = np.random.default_rng(args.seed)
+            referrers = rng.integers(0, len(graph), size=args.synthetic)
+            signup_ids = None
+        else:
+            signups = np.flatnonzero(graph.has_referrer_code)
+            if args.signups:
+                signups = signups[-args.signups:]
+            referrers = graph.parent[signups]
+            signup_ids = list(graph.ids[signups]) if args.signups else None
+
+        started = time.perf_counter()
+        payouts = compute_payouts(graph, referrers, args.fee, percentages)
+        print(f"Computed in {time.perf_counter() - started:.3f}s\n")
+        print_payouts(payouts, percentages)
+
+        if not args.synthetic:
+            actual_bonus, actual_leftover, unknown = await load_actual(conn, graph, signup_ids)
+            print_diff(graph, payouts, actual_bonus, actual_leftover, unknown, args.top)
+
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schedule", default="live", help="live, reduction-factors or comma-separated tier shares")
+    parser.add_argument("--fee", type=float, default=SIGNUP_FEE, help="signup fee per signup")
+    parser.add_argument("--signups", type=int, default=0, help="only the latest N signups (default: all)")
+    parser.add_argument("--synthetic", type=int, default=0, help="N hypothetical signups under random existing users")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top", type=int, default=20, help="accounts listed in the diff")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from typing import List, Literal, Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -6,6 +8,20 @@ class Settings(BaseSettings):
     # Database
     # -----------------------------
     DATABASE_URL: str
+    DB_PROFILE: Literal["development", "production", "transaction_pooler"] = "development"
+    # Overrides for the selected profile (None = profile value)
+    DB_POOL_SIZE: Optional[int] = None
+    DB_MAX_OVERFLOW: Optional[int] = None
+    DB_POOL_TIMEOUT: Optional[int] = None
+    DB_POOL_RECYCLE: Optional[int] = None
+    DB_STATEMENT_TIMEOUT_MS: Optional[int] = None
+    DB_PREPARED_STATEMENT_CACHE_SIZE: Optional[int] = None
+    DB_ECHO: bool = False  # logs every statement synchronously, local debugging only
+    SQL_LOG_SAMPLE_RATE: float = 0.0  # fraction of statements written to the app.sql logger
+    SLOW_QUERY_THRESHOLD_MS: Optional[float] = 500  # None disables the slow-query log
+    READ_DATABASE_URL: Optional[str] = None  # streaming replica for list/tree/stats routes
+    REPLICA_MAX_LAG_SECONDS: float = 5.0  # beyond this, reads fall back to the primary
+    REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = 2.0
 
     # -----------------------------
     # JWT
@@ -15,10 +31,72 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
 
+    # -----------------------------
+    # Password hashing pool
+    # -----------------------------
+    BCRYPT_ROUNDS: Optional[int] = None  # set from `python -m app.commands.calibrate_hash`
+    HASH_POOL_KIND: Literal["thread", "process"] = "thread"  # bcrypt releases the GIL
+    HASH_POOL_WORKERS: Optional[int] = None  # defaults to os.cpu_count()
+    HASH_POOL_MAX_QUEUE: int = 64  # jobs waiting beyond this get a 503
+    HASH_ADMISSION_MAX_CONCURRENT: Optional[int] = None  # defaults to 2 x os.cpu_count()
+    HASH_RATE_PER_EMAIL_PER_MINUTE: float = 10
+    HASH_BURST_PER_EMAIL: float = 10
+    HASH_RATE_PER_IP_PER_MINUTE: float = 60
+    HASH_BURST_PER_IP: float = 30
+
+    # -----------------------------
+    # Auth caches
+    # -----------------------------
+    PRINCIPAL_CACHE_SIZE: int = 10000  # 0 disables the cache
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30  # bounds staleness across workers
+    JWT_CACHE_ENABLED: bool = True
+    JWT_CACHE_SIZE: int = 10000  # verified token payloads kept until their exp
+
+    # -----------------------------
+    # Refresh token revocation
+    # -----------------------------
+    REVOCATION_FILTER_CAPACITY: int = 1_000_000
+    REVOCATION_FILTER_ERROR_RATE: float = 0.001
+    REVOCATION_BATCH_SIZE: int = 100
+    REVOCATION_FLUSH_INTERVAL_SECONDS: float = 5.0
+
+    # -----------------------------
+    # Admin stats snapshot
+    # -----------------------------
+    ADMIN_STATS_REFRESH_INTERVAL_SECONDS: float = 30.0
+    ADMIN_STATS_MAX_AGE_SECONDS: float = 120.0  # older than this, a request refreshes inline
+
+    # -----------------------------
+    # Daily rollups
+    # -----------------------------
+    ROLLUP_SHARDS: int = 8  # rows per (day, metric, currency), spreads concurrent upserts
+    ROLLUP_MAX_RANGE_DAYS: int = 366  # widest range one analytics request may ask for
+
+    # -----------------------------
+    # Admin exports
+    # -----------------------------
+    EXPORT_BATCH_SIZE: int = 1000  # rows fetched per server-side cursor round trip
+
     # -----------------------------
     # Referrals
     # -----------------------------
     MASTER_REFERRAL_CODE: str = "MASTERKEY"
+    TEAM_TREE_MAX_NODES: int = 2000  # hard cap on nodes in one tree/children response
+    TEAM_TREE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # per worker, 0 disables the cache
+    TEAM_TREE_CACHE_TTL_SECONDS: int = 300  # bounds staleness across workers
+    TEAM_TREE_STREAM_BATCH_SIZE: int = 500  # rows fetched per server-side cursor round trip
+    TEAM_COUNT_SHARDS: int = 8  # team counter rows per user, spreads concurrent signups
+
+    # -----------------------------
+    # Hot accounts
+    # -----------------------------
+    # Credits to these accounts go to pending_credits and are folded into the
+    # ledger in batches instead of locking the user row on every signup.
+    HOT_ACCOUNT_MODE: bool = False
+    HOT_ACCOUNT_CODES: List[str] = []  # JSON list of referral codes, MASTER_REFERRAL_CODE is always included
+    HOT_ACCOUNT_SHARDS: int = 16
+    HOT_ACCOUNT_FOLD_INTERVAL_SECONDS: float = 1.0
+    HOT_ACCOUNT_FOLD_BATCH_SIZE: int = 5000  # per shard and fold
 
     # -----------------------------
     # Stripe
@@ -1 +1 @@
-from .db import engine, AsyncSessionLocal, get_db
+from .db import engine, AsyncSessionLocal, get_db, get_read_db, open_read_session
@@ -4,6 +4,11 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+
+from app.config import settings
+from app.database.query_log import install_query_logging
+from app.database.replica import ReplicaLagMonitor
 
 # Load environment variables
 load_dotenv()
@@ -12,25 +17,97 @@ DATABASE_URL: str | None = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError(" DATABASE_URL is not set in the environment.")
 
+# Optional streaming replica for read-only traffic
+READ_DATABASE_URL: str | None = settings.READ_DATABASE_URL
+
 # Ensure async driver is used
 if DATABASE_URL.startswith("postgresql+psycopg2"):
     DATABASE_URL = DATABASE_URL.replace("psycopg2", "asyncpg")
+if READ_DATABASE_URL and READ_DATABASE_URL.startswith("postgresql+psycopg2"):
+    READ_DATABASE_URL = READ_DATABASE_URL.replace("psycopg2", "asyncpg")
 
 # Setup SSL context for asyncpg
 ssl_context = ssl.create_default_context()
 ssl_context.check_hostname = False
 ssl_context.verify_mode = ssl.CERT_NONE  # Change to CERT_REQUIRED for full verification
 
+# -----------------------------
+# Engine profiles
+# -----------------------------
+# Pick one with DB_PROFILE; any DB_* setting that is set overrides the profile.
+ENGINE_PROFILES = {
+    "development": {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "statement_timeout_ms": None,
+        "prepared_statement_cache_size": 100,
+    },
+    "production": {
+        "pool_size": 20,
+        "max_overflow": 10,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "statement_timeout_ms": 15000,
+        "prepared_statement_cache_size": 500,
+    },
+    # Supabase/pgbouncer in transaction mode: server-side prepared statements
+    # don't survive across transactions, so both statement caches are off.
+    "transaction_pooler": {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 10,
+        "pool_recycle": 300,
+        "statement_timeout_ms": None,
+        "prepared_statement_cache_size": 0,
+    },
+}
+
+
+def engine_options(profile_name: str) -> dict:
+    """Keyword arguments for create_async_engine from a profile plus overrides."""
+    if profile_name not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE '{profile_name}', expected one of {sorted(ENGINE_PROFILES)}")
+
+    profile = dict(ENGINE_PROFILES[profile_name])
+    overrides = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "statement_timeout_ms": settings.DB_STATEMENT_TIMEOUT_MS,
+        "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+    }
+    profile.update({key: value for key, value in overrides.items() if value is not None})
+
+    connect_args = {
+        "ssl": ssl_context,
+        "prepared_statement_cache_size": profile["prepared_statement_cache_size"],
+    }
+    if profile["prepared_statement_cache_size"] == 0:
+        connect_args["statement_cache_size"] = 0  # asyncpg's own cache
+    if profile["statement_timeout_ms"]:
+        connect_args["server_settings"] = {"statement_timeout": str(profile["statement_timeout_ms"])}
+
+    return {
+        "echo": settings.DB_ECHO,
+        "future": True,
+        "connect_args": connect_args,
+        "pool_size": profile["pool_size"],
+        "max_overflow": profile["max_overflow"],
+        "pool_timeout": profile["pool_timeout"],
+        "pool_recycle": profile["pool_recycle"],
+        "pool_pre_ping": profile_name == "transaction_pooler",
+    }
+
+
 # Create async engine with SSL
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True,
-    future=True,
-    connect_args={"ssl": ssl_context},
-    pool_size=5, 
-    max_overflow=10, 
-    pool_timeout=30, 
-    pool_recycle=1800,
+engine = create_async_engine(DATABASE_URL, **engine_options(settings.DB_PROFILE))
+install_query_logging(
+    engine,
+    sample_rate=settings.SQL_LOG_SAMPLE_RATE,
+    slow_threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
 )
 
 # Async session factory
@@ -40,7 +117,49 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False
 )
 
+# Read replica (falls back to the primary when unset or lagging)
+read_engine = None
+ReadSessionLocal = None
+replica_monitor = None
+if READ_DATABASE_URL:
+    read_engine = create_async_engine(READ_DATABASE_URL, **engine_options(settings.DB_PROFILE))
+    install_query_logging(
+        read_engine,
+        sample_rate=settings.SQL_LOG_SAMPLE_RATE,
+        slow_threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    )
+    ReadSessionLocal = sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False)
+    replica_monitor = ReplicaLagMonitor(
+        read_engine,
+        max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+        check_interval=settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+    )
+
+
 # FastAPI dependency
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
+
+
+@asynccontextmanager
+async def open_read_session(primary: bool = False) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for read-only work: the replica when it is within
+    REPLICA_MAX_LAG_SECONDS, otherwise (or with ``primary``, for reads that
+    must see the latest commits) the primary. Either way the transaction is
+    opened READ ONLY, so a stray write fails loudly.
+    """
+    factory = AsyncSessionLocal
+    if not primary and ReadSessionLocal is not None and await replica_monitor.replica_usable():
+        factory = ReadSessionLocal
+
+    async with factory() as session:
+        await session.connection(execution_options={"postgresql_readonly": True})
+        yield session
+
+
+# FastAPI dependency for list/tree/stats routes
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    async with open_read_session() as session:
+        yield session
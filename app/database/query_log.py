@@ -0,0 +1,94 @@
+import json
+import logging
+import random
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+sql_logger = logging.getLogger("app.sql")
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+# "METHOD /path" of the request currently being served, for attributing queries
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+MAX_STATEMENT_LENGTH = 2000
+
+
+def _params_shape(parameters: Any, executemany: bool) -> Any:
+    """Types only, never values (these can be password hashes, emails, ...)."""
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = parameters[0] if parameters else None
+        return {"rows": len(parameters), "row": _params_shape(first, False)}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+def install_query_logging(engine: AsyncEngine, sample_rate: float, slow_threshold_ms: Optional[float]):
+    """
+    Structured query logging for ``engine``.
+
+    - ``app.sql`` gets a random ``sample_rate`` fraction of statements at INFO.
+    - ``app.sql.slow`` gets every statement slower than ``slow_threshold_ms``
+      at WARNING, with the parameter shape and the route that issued it.
+    """
+    if sample_rate <= 0 and slow_threshold_ms is None:
+        return
+
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started_at"].pop()
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        slow = slow_threshold_ms is not None and duration_ms >= slow_threshold_ms
+        sampled = sample_rate > 0 and random.random() < sample_rate
+        if not (slow or sampled):
+            return
+
+        record = {
+            "statement": _WHITESPACE.sub(" ", statement).strip()[:MAX_STATEMENT_LENGTH],
+            "params": _params_shape(parameters, executemany),
+            "duration_ms": round(duration_ms, 3),
+            "route": current_route.get(),
+        }
+        if slow:
+            slow_query_logger.warning(json.dumps(record))
+        else:
+            sql_logger.info(json.dumps(record))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        # Keep the timing stack balanced when a statement fails
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started_at"):
+            conn.info["query_started_at"].pop()
+
+
+class RouteContextMiddleware:
+    """Pure ASGI middleware that records the current route for the query log."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        token = current_route.set(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_route.reset(token)
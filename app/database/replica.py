@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# 0 when the replica has replayed everything it received (an idle primary
+# would otherwise look "behind" by the time since the last write).
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaLagMonitor:
+    """
+    Decides whether reads may go to the replica.
+
+    Lag is sampled at most every ``check_interval`` seconds and shared by all
+    requests in between. A replica that lags more than ``max_lag`` seconds,
+    or cannot be reached, sends reads back to the primary until the next check.
+    """
+
+    def __init__(self, engine: AsyncEngine, max_lag: float, check_interval: float):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+
+        self._lock = asyncio.Lock()
+        self._checked_at = 0.0
+        self._usable = False
+        self.lag_seconds: Optional[float] = None
+
+        # Metrics
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+
+    async def _check(self):
+        try:
+            async with self.engine.connect() as conn:
+                lag = (await conn.execute(REPLICA_LAG_QUERY)).scalar()
+            self.lag_seconds = float(lag or 0)
+            self._usable = self.lag_seconds <= self.max_lag
+            if not self._usable:
+                logger.warning(f"⚠️ Replica lag {self.lag_seconds:.1f}s over {self.max_lag}s, reading from primary")
+        except Exception as e:
+            logger.error(f"❌ Replica lag check failed, reading from primary: {e}")
+            self.lag_seconds = None
+            self._usable = False
+        self._checked_at = time.monotonic()
+
+    async def replica_usable(self) -> bool:
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            async with self._lock:
+                if time.monotonic() - self._checked_at >= self.check_interval:
+                    await self._check()
+
+        if self._usable:
+            self.replica_reads += 1
+        else:
+            self.primary_fallbacks += 1
+        return self._usable
+
+    def stats(self) -> dict:
+        return {
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": self.max_lag,
+            "using_replica": self._usable,
+            "replica_reads": self.replica_reads,
+            "primary_fallbacks": self.primary_fallbacks,
+        }
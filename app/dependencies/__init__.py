@@ -1 +1 @@
-from .auth import get_current_user, get_current_admin
+from .auth import get_current_user, get_current_admin, invalidate_principal
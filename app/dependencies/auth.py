@@ -1,3 +1,5 @@
+import hashlib
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -6,18 +8,40 @@ from jose import jwt, JWTError
 
 from app.config import settings
 from app.database import get_db
+from app.utils.cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# Slim principal dicts keyed by user id. Anything that changes status, role
+# or withdrawal_status must call invalidate_principal() for that user.
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+# Verified JWT payloads keyed by token digest; each entry expires with its token.
+jwt_cache = TTLCache(maxsize=settings.JWT_CACHE_SIZE)
+
+
+def invalidate_principal(user_id: str):
+    principal_cache.invalidate(str(user_id))
+
 
 def decode_jwt(token: str):
+    cache_key = None
+    if settings.JWT_CACHE_ENABLED:
+        cache_key = hashlib.sha256(token.encode("utf-8")).digest()
+        payload = jwt_cache.get(cache_key)
+        if payload is not None:
+            return dict(payload)
+
     try:
         payload = jwt.decode(
             token,
             settings.JWT_SECRET,
             algorithms=[settings.JWT_ALGORITHM],
         )
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -25,10 +49,44 @@ def decode_jwt(token: str):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Tokens without exp are never cached
+    if cache_key is not None and isinstance(payload.get("exp"), (int, float)):
+        jwt_cache.set(cache_key, payload, expires_at=payload["exp"])
+    return dict(payload)
+
 
 # -----------------------------
 # CURRENT USER
 # -----------------------------
+async def load_principal(user_id: str, db: AsyncSession):
+    """The user's principal from the cache or the DB; None if the user doesn't exist."""
+    principal = principal_cache.get(str(user_id))
+    if principal is None:
+        # Query DB for user by ID (only the columns the principal needs)
+        query = text("""
+            SELECT id, email, username, role, status, withdrawal_status
+            FROM users
+            WHERE id = :uid
+            LIMIT 1
+        """)
+        result = await db.execute(query, {"uid": user_id})
+        user = result.fetchone()
+
+        if not user:
+            return None
+
+        principal = {
+            "id": str(user.id),
+            "email": user.email,
+            "username": user.username,
+            "role": user.role,
+            "status": user.status,
+            "withdrawal_status": user.withdrawal_status,
+        }
+        principal_cache.set(principal["id"], principal)
+    return principal
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db),
@@ -37,25 +95,19 @@ async def get_current_user(
     if payload is None or "sub" not in payload:
         raise HTTPException(status_code=401, detail="Invalid authentication")
 
-    # Query DB for user by ID
-    query = text("SELECT * FROM users WHERE id = :uid LIMIT 1")
-    result = await db.execute(query, {"uid": payload["sub"]})
-    user = result.fetchone()
+    # Refresh tokens are only good for /auth/refresh/
+    if payload.get("type") == "refresh":
+        raise HTTPException(status_code=401, detail="Invalid authentication")
 
-    if not user:
+    principal = await load_principal(payload["sub"], db)
+    if principal is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if user.status != "active":
+    if principal["status"] != "active":
         raise HTTPException(status_code=403, detail="User account is not active")
 
-    return {
-        "id": str(user.id),
-        "email": user.email,
-        "username": user.username,
-        "role": user.role,
-        "status": user.status,
-        "withdrawal_status": user.withdrawal_status,
-    }
+    # Callers get their own copy so they can't mutate the cached entry
+    return dict(principal)
 
 
 # -----------------------------
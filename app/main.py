@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -13,6 +15,11 @@ from app.routers import (
     dashboard,
     webhook_router,  # 👈 Import webhook router
 )
+from app.database.query_log import RouteContextMiddleware
+from app.utils.security import hash_pool
+from app.services.revocation_service import revocations
+from app.services.hot_account_service import hot_accounts
+from app.services.admin_stats_service import admin_stats
 
 app = FastAPI(
     title="Optivus Backend",
@@ -38,6 +45,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Attribute logged/slow SQL to the route that issued it
+app.add_middleware(RouteContextMiddleware)
+
 # Routers
 app.include_router(auth.router)
 app.include_router(users.router)
@@ -50,6 +60,30 @@ app.include_router(public.router)
 app.include_router(team.router)
 app.include_router(webhook_router.router)  # 👈 Add webhook routes
 
+
+# Long-running background loops, cancelled on shutdown
+background_tasks: list[asyncio.Task] = []
+
+
+@app.on_event("startup")
+async def startup():
+    await revocations.load()
+    background_tasks.append(asyncio.create_task(revocations.run_flusher()))
+    if hot_accounts.enabled:
+        background_tasks.append(asyncio.create_task(hot_accounts.run_folder()))
+    background_tasks.append(asyncio.create_task(admin_stats.run_refresher()))
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await revocations.flush()
+    if hot_accounts.enabled:
+        await hot_accounts.fold_all()
+    hash_pool.shutdown()
+
+
 @app.get("/")
 async def root():
     return {"message": "Optivus API is running 🚀"}
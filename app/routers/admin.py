@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from datetime import date, datetime
+from typing import List, Literal, Optional
+from uuid import UUID
 
-from app.schemas.admin_schemas import AdminStatsResponse, AdminUserResponse, AdminUserCreateRequest, AdminKYCProcessRequest
+from app.schemas.admin_schemas import (
+    AdminStatsResponse, AdminDailyRollupResponse, AdminUserResponse, AdminUserCreateRequest, AdminUserUpdateRequest, AdminKYCProcessRequest
+)
 from app.services import admin_service
 from app.dependencies import get_current_admin
-from app.database import get_db
+from app.database import get_db, get_read_db
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -14,16 +19,57 @@ router = APIRouter(prefix="/admin", tags=["Admin"])
 # STATS
 # -----------------------------
 @router.get("/stats/", response_model=AdminStatsResponse)
-async def get_stats(admin=Depends(get_current_admin), db: AsyncSession = Depends(get_db)):
-    return await admin_service.get_stats(admin, db)
+async def get_stats(admin=Depends(get_current_admin)):
+    return await admin_service.get_stats(admin)
+
+
+# -----------------------------
+# ANALYTICS
+# -----------------------------
+@router.get("/analytics/daily/", response_model=List[AdminDailyRollupResponse])
+async def get_daily_analytics(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    metric: Optional[str] = None,
+    currency: Optional[str] = None,
+    admin=Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await admin_service.get_daily_analytics(admin, date_from, date_to, metric, currency, db)
 
 
 # -----------------------------
 # USERS
 # -----------------------------
+def _set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+
 @router.get("/users/", response_model=List[AdminUserResponse])
-async def list_users(admin=Depends(get_current_admin), db: AsyncSession = Depends(get_db)):
-    return await admin_service.list_users(admin, db)
+async def list_users(
+    response: Response,
+    status: Optional[str] = None,
+    role: Optional[str] = None,
+    referred_by_code: Optional[str] = None,
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    order: Literal["desc", "asc"] = "desc",
+    admin=Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Users by signup time. ``X-Next-Cursor`` fetches the next page (pass it
+    as ``cursor`` with the same filters and order).
+    """
+    users, next_cursor = await admin_service.list_users(
+        admin, db, status=status, role=role, referred_by_code=referred_by_code,
+        created_from=created_from, created_to=created_to, cursor=cursor, limit=limit, order=order,
+    )
+    _set_next_cursor(response, next_cursor)
+    return users
 
 
 @router.post("/users/")
@@ -38,11 +84,21 @@ async def create_user(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.patch("/users/{user_id}/", response_model=AdminUserResponse)
+async def update_user(
+    user_id: str,
+    payload: AdminUserUpdateRequest,
+    admin=Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    return await admin_service.update_user(admin, user_id, payload, db)
+
+
 # -----------------------------
 # KYC
 # -----------------------------
 @router.get("/kyc/")
-async def list_kyc_requests(admin=Depends(get_current_admin), db: AsyncSession = Depends(get_db)):
+async def list_kyc_requests(admin=Depends(get_current_admin), db: AsyncSession = Depends(get_read_db)):
     return await admin_service.list_kyc_requests(admin, db)
 
 
@@ -66,8 +122,24 @@ async def process_kyc(
 # WITHDRAWALS
 # -----------------------------
 @router.get("/withdrawals/")
-async def list_withdrawals(admin=Depends(get_current_admin), db: AsyncSession = Depends(get_db)):
-    return await admin_service.list_withdrawals(admin, db)
+async def list_withdrawals(
+    response: Response,
+    status: Optional[str] = None,
+    user_id: Optional[UUID] = None,
+    requested_from: Optional[datetime] = Query(None, alias="from"),
+    requested_to: Optional[datetime] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    order: Literal["desc", "asc"] = "desc",
+    admin=Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db),
+):
+    withdrawals, next_cursor = await admin_service.list_withdrawals(
+        admin, db, status=status, user_id=str(user_id) if user_id else None,
+        requested_from=requested_from, requested_to=requested_to, cursor=cursor, limit=limit, order=order,
+    )
+    _set_next_cursor(response, next_cursor)
+    return withdrawals
 
 
 @router.post("/withdrawals/{withdrawal_id}/approve/")
@@ -84,5 +156,81 @@ async def deny_withdrawal(withdrawal_id: str, admin=Depends(get_current_admin),
 # TRANSACTIONS
 # -----------------------------
 @router.get("/transactions/")
-async def list_all_transactions(admin=Depends(get_current_admin), db: AsyncSession = Depends(get_db)):
-    return await admin_service.list_transactions(admin, db)
+async def list_all_transactions(
+    response: Response,
+    type: Optional[str] = None,
+    status: Optional[str] = None,
+    user_id: Optional[UUID] = None,
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    order: Literal["desc", "asc"] = "desc",
+    admin=Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db),
+):
+    transactions, next_cursor = await admin_service.list_transactions(
+        admin, db, type=type, status=status, user_id=str(user_id) if user_id else None,
+        created_from=created_from, created_to=created_to, cursor=cursor, limit=limit, order=order,
+    )
+    _set_next_cursor(response, next_cursor)
+    return transactions
+
+
+# -----------------------------
+# EXPORTS
+# -----------------------------
+EXPORT_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def _export_response(name: str, format: str, body) -> StreamingResponse:
+    filename = f"{name}-{datetime.utcnow():%Y%m%dT%H%M%SZ}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/export/transactions/")
+async def export_transactions(
+    format: Literal["csv", "ndjson"] = "csv",
+    type: Optional[str] = None,
+    status: Optional[str] = None,
+    user_id: Optional[UUID] = None,
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    admin=Depends(get_current_admin),
+):
+    """Full (filtered) transaction history, oldest first, streamed in constant memory."""
+    return _export_response("transactions", format, admin_service.stream_export(
+        "transactions", admin_service.TRANSACTION_EXPORT_COLUMNS, "created_at",
+        {"type": type, "status": status, "user_id": str(user_id) if user_id else None},
+        created_from, created_to, format,
+    ))
+
+
+@router.get("/export/users/")
+async def export_users(
+    format: Literal["csv", "ndjson"] = "csv",
+    status: Optional[str] = None,
+    role: Optional[str] = None,
+    referred_by_code: Optional[str] = None,
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    admin=Depends(get_current_admin),
+):
+    """All (filtered) users by signup time, streamed in constant memory. No secrets are exported."""
+    return _export_response("users", format, admin_service.stream_export(
+        "users", admin_service.USER_EXPORT_COLUMNS, "created_at",
+        {"status": status, "role": role, "referred_by_code": referred_by_code},
+        created_from, created_to, format,
+    ))
+
+
+# -----------------------------
+# METRICS
+# -----------------------------
+@router.get("/metrics/")
+async def get_metrics(admin=Depends(get_current_admin)):
+    return await admin_service.get_metrics(admin)
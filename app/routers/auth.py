@@ -2,13 +2,15 @@ from fastapi import APIRouter, Depends, Request, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.auth_schemas import (
-    LoginRequest, RegisterRequest, TwoFAVerifyRequest,
+    LoginRequest, RegisterRequest, TwoFAVerifyRequest, RefreshTokenRequest,
     PasswordResetRequest, PasswordResetConfirmRequest,
     TokenResponse, TwoFARequiredResponse,
     InitiateRegistrationRequest, InitiateRegistrationResponse,
 )
 from app.services import auth_service, webhook_service
 from app.database import get_db
+from app.utils.admission import client_ip
+from app.utils.security import hash_admission
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -17,20 +19,24 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 # LOGIN
 # -----------------------------
 @router.post("/login/", response_model=TokenResponse | TwoFARequiredResponse)
-async def login(payload: LoginRequest, db: AsyncSession = Depends(get_db)):
-    return await auth_service.login(payload, db)
+async def login(payload: LoginRequest, request: Request, db: AsyncSession = Depends(get_db)):
+    async with hash_admission.admit(email=payload.email, ip=client_ip(request)):
+        return await auth_service.login(payload, db)
 
 
 # -----------------------------
 # REGISTRATION (NEW FLOW)
 # -----------------------------
 @router.post("/initiate-registration/", response_model=InitiateRegistrationResponse)
-async def initiate_registration(payload: InitiateRegistrationRequest, db: AsyncSession = Depends(get_db)):
+async def initiate_registration(
+    payload: InitiateRegistrationRequest, request: Request, db: AsyncSession = Depends(get_db)
+):
     """
     Step 1: Validate registration data, create payment intent, and store
     pending registration in DB. Returns Stripe client_secret.
     """
-    return await auth_service.initiate_registration(payload, db)
+    async with hash_admission.admit(email=payload.email, ip=client_ip(request)):
+        return await auth_service.initiate_registration(payload, db)
 
 
 @router.post("/webhooks/stripe/")
@@ -57,6 +63,19 @@ async def verify_2fa(payload: TwoFAVerifyRequest, db: AsyncSession = Depends(get
     return await auth_service.verify_2fa(payload, db)
 
 
+# -----------------------------
+# TOKEN REFRESH / LOGOUT
+# -----------------------------
+@router.post("/refresh/", response_model=TokenResponse)
+async def refresh(payload: RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
+    return await auth_service.refresh(payload, db)
+
+
+@router.post("/logout/")
+async def logout(payload: RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
+    return await auth_service.logout(payload, db)
+
+
 # -----------------------------
 # PASSWORD RESET
 # -----------------------------
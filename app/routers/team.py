@@ -1,24 +1,115 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal, Optional
+from uuid import UUID
 
-from app.database import get_db
+from app.database import get_read_db
 from app.dependencies.auth import get_current_user
-from app.services.team_service import get_referral_tree
+from app.schemas.team_schemas import TeamStatsResponse
+from app.services.team_service import (
+    get_referral_tree_page, get_tree_children_page, stream_referral_tree, get_team_stats
+)
 
 router = APIRouter(
     prefix="/team",
     tags=["Team"],
 )
 
+
+def _page_response(request: Request, page: dict) -> Response:
+    """Cached tree page as JSON, or 304 when the client's ETag still matches."""
+    headers = {"ETag": page["etag"], "Cache-Control": "private, no-cache"}
+    if page["next_cursor"]:
+        headers["X-Next-Cursor"] = page["next_cursor"]
+    if page["truncated"]:
+        headers["X-Tree-Truncated"] = "true"
+
+    if_none_match = request.headers.get("if-none-match", "")
+    client_etags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if page["etag"] in client_etags or "*" in client_etags:
+        return Response(status_code=304, headers=headers)
+    return Response(content=page["body"], media_type="application/json", headers=headers)
+
+
 # -----------------------------
 # GET Referral Tree
 # -----------------------------
 @router.get("/tree/")
 async def referral_tree(
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    max_depth: int = Query(3, ge=1, le=10),
+    child_limit: int = Query(50, ge=1, le=200),
+    format: Literal["nested", "flat"] = "nested",
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get the top ``max_depth`` levels of the referral tree for the current
+    authenticated user, at most ``child_limit`` children per node. Expand
+    nodes with a ``children_cursor`` through ``/team/tree/{node_id}/children/``;
+    ``X-Next-Cursor`` pages through the user's own direct referrals.
+    Send the ``ETag`` back as ``If-None-Match`` to get a 304 when unchanged.
+    ``format=flat`` returns columnar arrays with a ``parents`` index array
+    instead of nested children (much smaller for large teams).
+    """
+    page = await get_referral_tree_page(
+        current_user["id"], max_depth=max_depth, child_limit=child_limit, format=format  # 🔑 FIXED: use "id"
+    )
+    return _page_response(request, page)
+
+
+# -----------------------------
+# GET Referral Tree (streamed)
+# -----------------------------
+@router.get("/tree/stream/")
+async def referral_tree_stream(
+    max_depth: Optional[int] = Query(None, ge=1),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    The full downline as NDJSON: one node per line in level order, each
+    with ``parent_id`` (the current user for direct referrals).
+    """
+    return StreamingResponse(
+        stream_referral_tree(str(current_user["id"]), max_depth=max_depth),
+        media_type="application/x-ndjson",
+    )
+
+
+# -----------------------------
+# GET Children of a tree node
+# -----------------------------
+@router.get("/tree/{node_id}/children/")
+async def referral_tree_children(
+    node_id: UUID,
+    request: Request,
+    cursor: Optional[str] = None,
+    max_depth: int = Query(1, ge=1, le=10),
+    child_limit: int = Query(50, ge=1, le=200),
+    format: Literal["nested", "flat"] = "nested",
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Next page of a node's children (pass the node's ``children_cursor``),
+    each with ``max_depth - 1`` levels below it.
+    """
+    page = await get_tree_children_page(
+        current_user["id"], str(node_id), cursor=cursor, max_depth=max_depth, child_limit=child_limit,
+        format=format,
+    )
+    return _page_response(request, page)
+
+
+# -----------------------------
+# GET Team statistics
+# -----------------------------
+@router.get("/stats/", response_model=TeamStatsResponse)
+async def team_stats(
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Get the referral tree for the current authenticated user.
+    Members and earned referral bonus per tier (1-6), plus direct referrals
+    and the whole downline size.
     """
-    return await get_referral_tree(current_user["id"], db)  # 🔑 FIXED: use "id"
+    return await get_team_stats(current_user["id"], db)
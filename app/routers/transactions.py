@@ -5,7 +5,7 @@ from typing import List
 from app.schemas.transaction_schemas import TransactionResponse
 from app.services import transaction_service
 from app.dependencies import get_current_user
-from app.database import get_db
+from app.database import get_read_db
 
 router = APIRouter(prefix="/transactions", tags=["Transactions"])
 
@@ -15,7 +15,7 @@ async def list_transactions(
     user=Depends(get_current_user),
     page: int = 1,
     page_size: int = 20,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     return await transaction_service.list_transactions(user, page, page_size, db)
 
@@ -24,6 +24,6 @@ async def list_transactions(
 async def get_transaction(
     transaction_id: str,
     user=Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     return await transaction_service.get_transaction(user, transaction_id, db)
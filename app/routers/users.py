@@ -1,5 +1,5 @@
 # app/routers/users.py
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.user_schemas import (
@@ -10,7 +10,9 @@ from app.schemas.user_schemas import (
 from app.schemas.transaction_schemas import TransactionResponse
 from app.services import user_service, transaction_service
 from app.dependencies import get_current_user
-from app.database import get_db
+from app.database import get_db, get_read_db
+from app.utils.admission import client_ip
+from app.utils.security import hash_admission
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -41,10 +43,12 @@ async def update_profile(
 @router.post("/change-password/")
 async def change_password(
     payload: ChangePasswordRequest,
+    request: Request,
     user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    return await user_service.change_password(user, payload, db)
+    async with hash_admission.admit(email=user["email"], ip=client_ip(request)):
+        return await user_service.change_password(user, payload, db)
 
 
 # -----------------------------
@@ -53,28 +57,34 @@ async def change_password(
 @router.post("/set-pin/")
 async def set_pin(
     payload: SetPinRequest,
+    request: Request,
     user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    return await user_service.set_pin(user, payload, db)
+    async with hash_admission.admit(email=user["email"], ip=client_ip(request)):
+        return await user_service.set_pin(user, payload, db)
 
 
 @router.patch("/change-pin/")
 async def change_pin(
     payload: ChangePinRequest,
+    request: Request,
     user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    return await user_service.change_pin(user, payload, db)
+    async with hash_admission.admit(email=user["email"], ip=client_ip(request)):
+        return await user_service.change_pin(user, payload, db)
 
 
 @router.post("/verify-pin/")
 async def verify_pin(
     payload: VerifyPinRequest,
+    request: Request,
     user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    return await user_service.verify_user_pin(user, payload, db)
+    async with hash_admission.admit(email=user["email"], ip=client_ip(request)):
+        return await user_service.verify_user_pin(user, payload, db)
 
 
 # -----------------------------
@@ -92,7 +102,7 @@ async def request_withdrawal(
 @router.get("/withdrawals/", response_model=list[WithdrawalResponse])
 async def list_withdrawals(
     user: dict = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     return await user_service.list_withdrawals(user, db)
 
@@ -103,7 +113,7 @@ async def list_withdrawals(
 @router.get("/transactions/", response_model=list[TransactionResponse])
 async def list_transactions(
     user: dict = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0)
 ):
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel, EmailStr, Field
 from typing import Literal, Optional
 
@@ -12,6 +12,15 @@ class AdminStatsResponse(BaseModel):
     admin_referral_earnings: str
     pending_withdrawals_count: int
     protocol_balance: str
+    as_of: datetime
+
+
+class AdminDailyRollupResponse(BaseModel):
+    day: date
+    metric: str
+    currency: Optional[str] = None  # None for count-only metrics (signups)
+    count: int
+    amount: str
 
 
 class AdminUserResponse(BaseModel):
@@ -40,6 +49,15 @@ class AdminUserCreateRequest(BaseModel):
         populate_by_name = True   # ✅ allows both snake_case & camelCase
 
 
+class AdminUserUpdateRequest(BaseModel):
+    role: Optional[Literal["user", "admin"]] = None
+    status: Optional[Literal["active", "frozen"]] = None
+    withdrawal_status: Optional[Literal["active", "paused"]] = Field(None, alias="withdrawalStatus")
+
+    class Config:
+        populate_by_name = True
+
+
 class AdminKYCResponse(BaseModel):
     id: str
     dateSubmitted: datetime
@@ -39,6 +39,10 @@ class TwoFAVerifyRequest(BaseModel):
     token: str
 
 
+class RefreshTokenRequest(BaseModel):
+    refresh: str
+
+
 class PasswordResetRequest(BaseModel):
     email: EmailStr
 
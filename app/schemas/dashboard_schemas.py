@@ -4,3 +4,4 @@ class UserDashboardStatsResponse(BaseModel):
     totalEarnings: float
     totalTeamSize: int
     directReferrals: int
+    pendingWithdrawals: float = 0
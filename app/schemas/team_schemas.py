@@ -10,3 +10,16 @@ class ReferralNode(BaseModel):
     class Config:
         orm_mode = True
         arbitrary_types_allowed = True
+
+
+class TeamTierStats(BaseModel):
+    tier: int
+    members: int
+    earned: str
+
+
+class TeamStatsResponse(BaseModel):
+    tiers: List[TeamTierStats]
+    directReferrals: int
+    totalTeamSize: int
+    totalEarned: str
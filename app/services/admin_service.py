@@ -1,60 +1,100 @@
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from datetime import datetime
-from typing import List
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from uuid import uuid4
+import csv
+import io
+import json
 import secrets
 
-from app.schemas.admin_schemas import AdminStatsResponse, AdminUserResponse, AdminUserCreateRequest
-from app.utils.security import hash_password
+from app.schemas.admin_schemas import (
+    AdminStatsResponse, AdminDailyRollupResponse, AdminUserResponse, AdminUserCreateRequest, AdminUserUpdateRequest
+)
+from app.dependencies.auth import invalidate_principal, principal_cache, jwt_cache
+from app.utils.security import hash_password_async, hash_pool, hash_admission
+from app.services.revocation_service import revocations
+from app.database import open_read_session
+from app.database.db import replica_monitor
+from app.services.referral_service import add_user_to_closure
+from app.services.team_service import invalidate_team_trees, tree_cache
+from app.services.ledger_service import post_entry
+from app.services import user_stats_service, rollup_service
+from app.utils.common import to_minor_units
+from app.services.hot_account_service import hot_accounts
+from app.services.admin_stats_service import admin_stats
+from app.config import settings
+from app.utils.pagination import decode_keyset_cursor, keyset_page
 
 
 # -----------------------------
 # ADMIN DASHBOARD STATS
 # -----------------------------
-async def get_stats(admin, db: AsyncSession) -> AdminStatsResponse:
-    res_users = await db.execute(text("SELECT COUNT(*) FROM users"))
-    total_users = res_users.scalar() or 0
-
-    res_ref = await db.execute(
-        text("SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE type = 'referral_bonus'")
-    )
-    total_user_referral_earnings = str(res_ref.scalar() or 0)
-
-    res_admin = await db.execute(
-        text(
-            "SELECT COALESCE(SUM(amount), 0) FROM transactions "
-            "WHERE type = 'referral_bonus' AND user_id = :aid"
-        ),
-        {"aid": admin["id"]},
+async def get_stats(admin) -> AdminStatsResponse:
+    # Served from the background-refreshed snapshot (see admin_stats_service)
+    snapshot = await admin_stats.get()
+    return AdminStatsResponse(
+        total_users=snapshot["total_users"],
+        total_user_referral_earnings=snapshot["total_user_referral_earnings"],
+        admin_referral_earnings=snapshot["admin_referral_earnings"].get(str(admin["id"]), "0"),
+        pending_withdrawals_count=snapshot["pending_withdrawals_count"],
+        protocol_balance=snapshot["protocol_balance"],
+        as_of=snapshot["as_of"],
     )
-    admin_referral_earnings = str(res_admin.scalar() or 0)
 
-    res_wdr = await db.execute(text("SELECT COUNT(*) FROM withdrawals WHERE status = 'pending'"))
-    pending_withdrawals_count = res_wdr.scalar() or 0
 
-    res_bal = await db.execute(text("SELECT COALESCE(SUM(balance), 0) FROM users"))
-    protocol_balance = str(res_bal.scalar() or 0)
+# -----------------------------
+# DAILY ANALYTICS
+# -----------------------------
+async def get_daily_analytics(
+    admin,
+    date_from: Optional[date],
+    date_to: Optional[date],
+    metric: Optional[str],
+    currency: Optional[str],
+    db: AsyncSession,
+) -> List[AdminDailyRollupResponse]:
+    # Answered from daily_rollups only; the raw tables are never scanned here
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if (date_to - date_from).days + 1 > settings.ROLLUP_MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=400, detail=f"Range is limited to {settings.ROLLUP_MAX_RANGE_DAYS} days"
+        )
 
-    return AdminStatsResponse(
-        total_users=total_users,
-        total_user_referral_earnings=total_user_referral_earnings,
-        admin_referral_earnings=admin_referral_earnings,
-        pending_withdrawals_count=pending_withdrawals_count,
-        protocol_balance=protocol_balance,
-    )
+    rows = await rollup_service.get_daily(db, date_from, date_to, metric, currency)
+    return [AdminDailyRollupResponse(**r) for r in rows]
 
 
 # -----------------------------
 # USERS
 # -----------------------------
-async def list_users(admin, db: AsyncSession) -> List[AdminUserResponse]:
-    query = text("SELECT * FROM users ORDER BY created_at DESC")
-    result = await db.execute(query)
-    records = result.fetchall()
+async def list_users(
+    admin,
+    db: AsyncSession,
+    *,
+    status: Optional[str] = None,
+    role: Optional[str] = None,
+    referred_by_code: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    order: str = "desc",
+) -> Tuple[List[AdminUserResponse], Optional[str]]:
+    """One page of users (newest first by default) and the cursor of the next page."""
+    query, params = _keyset_query(
+        "users", "created_at",
+        {"status": status, "role": role, "referred_by_code": referred_by_code},
+        created_from, created_to, cursor, limit, order,
+    )
+    result = await db.execute(query, params)
+    records, next_cursor = keyset_page(result.fetchall(), limit, "created_at")
 
-    return [
+    users = [
         AdminUserResponse(
             id=str(r.id),
             email=r.email,
@@ -67,6 +107,7 @@ async def list_users(admin, db: AsyncSession) -> List[AdminUserResponse]:
         )
         for r in records
     ]
+    return users, next_cursor
 
 
 async def create_user(admin, payload: AdminUserCreateRequest, db: AsyncSession):
@@ -85,7 +126,7 @@ async def create_user(admin, payload: AdminUserCreateRequest, db: AsyncSession):
     if check_username.fetchone():
         raise HTTPException(status_code=400, detail="Username already exists")
 
-    hashed_pw = hash_password(payload.password)
+    hashed_pw = await hash_password_async(payload.password)
     referral_code = secrets.token_hex(4).upper()
     referred_by_code = payload.referral_code
 
@@ -118,7 +159,11 @@ async def create_user(admin, payload: AdminUserCreateRequest, db: AsyncSession):
             "dt": datetime.utcnow(),
         },
     )
+    ancestor_ids = await add_user_to_closure(db, uid, referred_by_code)
+    await user_stats_service.record_signup(db, uid, ancestor_ids)
+    await rollup_service.record(db, [rollup_service.rollup_event(rollup_service.SIGNUP)])
     await db.commit()
+    invalidate_team_trees(ancestor_ids)
 
     return {
         "message": "User created successfully",
@@ -128,6 +173,45 @@ async def create_user(admin, payload: AdminUserCreateRequest, db: AsyncSession):
     }
 
 
+async def update_user(admin, user_id: str, payload: AdminUserUpdateRequest, db: AsyncSession) -> AdminUserResponse:
+    """
+    Freeze/unfreeze a user, pause withdrawals or change role.
+    """
+    changes = payload.model_dump(exclude_none=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+
+    assignments = ", ".join(f"{column} = :{column}" for column in changes)
+    result = await db.execute(
+        text(f"""
+            UPDATE users
+            SET {assignments}
+            WHERE id = :id
+            RETURNING id, email, username, role, status, withdrawal_status, is_kyc_verified, balance
+        """),
+        {**changes, "id": user_id},
+    )
+    r = result.fetchone()
+    if not r:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    await db.commit()
+
+    # 🔑 cached principals carry role/status, drop the stale one
+    invalidate_principal(user_id)
+
+    return AdminUserResponse(
+        id=str(r.id),
+        email=r.email,
+        username=r.username,
+        role=r.role,
+        status=r.status,
+        withdrawal_status=r.withdrawal_status,
+        is_kyc_verified=r.is_kyc_verified,
+        balance=str(r.balance),
+    )
+
+
 # -----------------------------
 # KYC
 # -----------------------------
@@ -224,20 +308,45 @@ async def process_kyc(admin, kyc_id: str, decision: str, rejection_reason: str |
 # -----------------------------
 # WITHDRAWALS
 # -----------------------------
-async def list_withdrawals(admin, db: AsyncSession):
-    query = text("SELECT * FROM withdrawals ORDER BY requested_at DESC")
-    result = await db.execute(query)
-    return [dict(r) for r in result.fetchall()]
+async def list_withdrawals(
+    admin,
+    db: AsyncSession,
+    *,
+    status: Optional[str] = None,
+    user_id: Optional[str] = None,
+    requested_from: Optional[datetime] = None,
+    requested_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    order: str = "desc",
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of withdrawal requests (newest first by default) and the next page's cursor."""
+    query, params = _keyset_query(
+        "withdrawals", "requested_at",
+        {"status": status, "user_id": user_id},
+        requested_from, requested_to, cursor, limit, order,
+    )
+    result = await db.execute(query, params)
+    records, next_cursor = keyset_page(result.fetchall(), limit, "requested_at")
+    return [dict(r._mapping) for r in records], next_cursor
 
 
 async def approve_withdrawal(admin, withdrawal_id: str, db: AsyncSession):
     if admin["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    # Fetch withdrawal
+    # Claim the withdrawal: only the request that flips it out of 'pending'
+    # gets a row back, so a concurrent approve can't settle it twice
+    approved_at = datetime.utcnow()
     res = await db.execute(
-        text("SELECT * FROM withdrawals WHERE id = :wid AND status = 'pending'"),
-        {"wid": withdrawal_id},
+        text(
+            """
+            UPDATE withdrawals SET status = 'approved', processed_at = :dt
+            WHERE id = :wid AND status = 'pending'
+            RETURNING user_id, amount, currency
+            """
+        ),
+        {"wid": withdrawal_id, "dt": approved_at},
     )
     withdrawal = res.mappings().first()
     if not withdrawal:
@@ -247,17 +356,9 @@ async def approve_withdrawal(admin, withdrawal_id: str, db: AsyncSession):
     amount = withdrawal["amount"]
     currency = withdrawal["currency"]
 
-    # Deduct from user balance
-    await db.execute(
-        text("UPDATE users SET balance = balance - :amt WHERE id = :uid"),
-        {"amt": amount, "uid": user_id},
-    )
-
-    # Mark withdrawal as approved
-    await db.execute(
-        text("UPDATE withdrawals SET status = 'approved' WHERE id = :wid"),
-        {"wid": withdrawal_id},
-    )
+    # Funds were already held on the ledger at request time; approving only
+    # settles the hold, it must not debit the balance a second time.
+    await user_stats_service.apply_deltas(db, pending_withdrawals={str(user_id): -to_minor_units(amount)})
 
     # Log transaction
     await db.execute(
@@ -276,9 +377,12 @@ async def approve_withdrawal(admin, withdrawal_id: str, db: AsyncSession):
             "amt": amount,
             "curr": currency,
             "ref": f"WDR-{withdrawal_id}",
-            "dt": datetime.utcnow(),
+            "dt": approved_at,
         },
     )
+    await rollup_service.record(
+        db, [rollup_service.rollup_event(rollup_service.WITHDRAWAL_APPROVED, currency, amount, day=approved_at.date())]
+    )
 
     await db.commit()
     return {"message": f"Withdrawal {withdrawal_id} approved and transaction logged"}
@@ -288,29 +392,24 @@ async def deny_withdrawal(admin, withdrawal_id: str, db: AsyncSession):
     if admin["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    # Fetch withdrawal
+    # Claim the withdrawal: only the request that flips it out of 'pending'
+    # gets a row back, so a concurrent deny can't release the hold twice
     res = await db.execute(
-        text("SELECT * FROM withdrawals WHERE id = :wid AND status = 'pending'"),
-        {"wid": withdrawal_id},
+        text(
+            """
+            UPDATE withdrawals SET status = 'denied', processed_at = :dt
+            WHERE id = :wid AND status = 'pending'
+            RETURNING user_id, amount
+            """
+        ),
+        {"wid": withdrawal_id, "dt": datetime.utcnow()},
     )
     withdrawal = res.mappings().first()
     if not withdrawal:
         raise HTTPException(status_code=404, detail="Withdrawal not found or already processed")
 
-    user_id = withdrawal["user_id"]
-    amount = withdrawal["amount"]
-
-    # Refund balance if it was already deducted at request time
-    await db.execute(
-        text("UPDATE users SET balance = balance + :amt WHERE id = :uid"),
-        {"amt": amount, "uid": user_id},
-    )
-
-    # Mark withdrawal as denied
-    await db.execute(
-        text("UPDATE withdrawals SET status = 'denied' WHERE id = :wid"),
-        {"wid": withdrawal_id},
-    )
+    # Release the hold taken at request time
+    await post_entry(db, withdrawal["user_id"], "withdrawal_release", withdrawal["amount"], withdrawal_id=withdrawal_id)
 
     await db.commit()
     return {"message": f"Withdrawal {withdrawal_id} denied and balance refunded"}
@@ -318,7 +417,187 @@ async def deny_withdrawal(admin, withdrawal_id: str, db: AsyncSession):
 # -----------------------------
 # TRANSACTIONS
 # -----------------------------
-async def list_transactions(admin, db: AsyncSession):
-    query = text("SELECT * FROM transactions ORDER BY created_at DESC")
-    result = await db.execute(query)
-    return [dict(r) for r in result.fetchall()]
+async def list_transactions(
+    admin,
+    db: AsyncSession,
+    *,
+    type: Optional[str] = None,
+    status: Optional[str] = None,
+    user_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    order: str = "desc",
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of transactions (newest first by default) and the next page's cursor."""
+    query, params = _keyset_query(
+        "transactions", "created_at",
+        {"type": type, "status": status, "user_id": user_id},
+        created_from, created_to, cursor, limit, order,
+    )
+    result = await db.execute(query, params)
+    records, next_cursor = keyset_page(result.fetchall(), limit, "created_at")
+    return [dict(r._mapping) for r in records], next_cursor
+
+
+# -----------------------------
+# KEYSET PAGINATION
+# -----------------------------
+def _filter_conditions(
+    time_column: str,
+    filters: Dict[str, Optional[str]],
+    time_from: Optional[datetime],
+    time_to: Optional[datetime],
+) -> Tuple[List[str], dict]:
+    """WHERE conditions and params for equality filters (None = unfiltered) and a [from, to) range."""
+    conditions = []
+    params = {}
+    for column, value in filters.items():
+        if value is not None:
+            cast = "CAST(:{0} AS uuid)" if column.endswith("_id") else ":{0}"
+            conditions.append(f"{column} = {cast.format(column)}")
+            params[column] = value
+    if time_from is not None:
+        conditions.append(f"{time_column} >= :time_from")
+        params["time_from"] = time_from
+    if time_to is not None:
+        conditions.append(f"{time_column} < :time_to")
+        params["time_to"] = time_to
+    return conditions, params
+
+
+def _keyset_query(
+    table: str,
+    time_column: str,
+    filters: Dict[str, Optional[str]],
+    time_from: Optional[datetime],
+    time_to: Optional[datetime],
+    cursor: Optional[str],
+    limit: int,
+    order: str,
+):
+    """
+    ``SELECT *`` page of ``table`` in (time_column, id) order, continuing
+    after the cursor's row. Equality filters and the time range narrow the
+    same composite indexes the order uses (see migration 0010), so a page
+    costs the same however deep it is.
+    """
+    conditions, params = _filter_conditions(time_column, filters, time_from, time_to)
+    params["limit"] = limit + 1
+
+    position = decode_keyset_cursor(cursor)
+    if position:
+        # Row comparison, so Postgres seeks straight to the cursor in the index
+        op = "<" if order == "desc" else ">"
+        conditions.append(f"({time_column}, id) {op} (:cursor_at, CAST(:cursor_id AS uuid))")
+        params["cursor_at"], params["cursor_id"] = position
+
+    direction = "DESC" if order == "desc" else "ASC"
+    query = text(f"""
+        SELECT * FROM {table}
+        WHERE {" AND ".join(conditions) or "true"}
+        ORDER BY {time_column} {direction}, id {direction}
+        LIMIT :limit
+    """)
+    return query, params
+
+
+# -----------------------------
+# EXPORTS
+# -----------------------------
+# Explicit columns: secrets (password/PIN hashes, 2FA seeds) never leave the DB
+USER_EXPORT_COLUMNS = [
+    "id", "email", "username", "first_name", "last_name", "referral_code", "referred_by_code",
+    "role", "status", "withdrawal_status", "balance", "is_kyc_verified", "is_2fa_enabled",
+    "has_pin", "created_at", "updated_at",
+]
+TRANSACTION_EXPORT_COLUMNS = [
+    "id", "user_id", "type", "amount", "currency", "status", "reference",
+    "referee_id", "tier", "note", "created_at",
+]
+
+
+def _export_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (str, bool, int)):
+        return value
+    return str(value)  # Decimal amounts stay exact, UUIDs as text
+
+
+def _csv_cell(value):
+    # Keep user-entered text from being evaluated as a spreadsheet formula
+    # (only text columns: negative amounts must stay numbers)
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@", "\t", "\r"):
+        return "'" + value
+    value = _export_value(value)
+    return "" if value is None else value
+
+
+async def stream_export(
+    table: str,
+    columns: List[str],
+    time_column: str,
+    filters: Dict[str, Optional[str]],
+    time_from: Optional[datetime],
+    time_to: Optional[datetime],
+    format: str,
+) -> AsyncIterator[bytes]:
+    """
+    Rows of ``table`` oldest first as CSV (with a header line) or NDJSON.
+
+    Rows are read through a server-side cursor EXPORT_BATCH_SIZE at a time
+    and each batch is encoded and yielded before the next is fetched; the
+    response only pulls the next chunk once the client has taken the last
+    one, so a slow download holds one batch in memory, not the table.
+    Opens its own session because it runs after the request's
+    dependencies have exited.
+    """
+    conditions, params = _filter_conditions(time_column, filters, time_from, time_to)
+    query = text(f"""
+        SELECT {", ".join(columns)} FROM {table}
+        WHERE {" AND ".join(conditions) or "true"}
+        ORDER BY {time_column}, id
+    """)
+
+    if format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue().encode()
+
+    async with open_read_session() as db:
+        result = await db.stream(query, params, execution_options={"yield_per": settings.EXPORT_BATCH_SIZE})
+        async for rows in result.partitions():
+            if format == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([_csv_cell(v) for v in r] for r in rows)
+                yield buffer.getvalue().encode()
+            else:
+                yield b"".join(
+                    json.dumps(
+                        {c: _export_value(v) for c, v in zip(columns, r)}, separators=(",", ":")
+                    ).encode() + b"\n"
+                    for r in rows
+                )
+
+
+# -----------------------------
+# RUNTIME METRICS
+# -----------------------------
+async def get_metrics(admin) -> dict:
+    return {
+        "hash_pool": hash_pool.stats(),
+        "hash_admission": hash_admission.stats(),
+        "principal_cache": principal_cache.stats(),
+        "jwt_cache": jwt_cache.stats(),
+        "refresh_revocations": revocations.stats(),
+        "read_replica": replica_monitor.stats() if replica_monitor else None,
+        "hot_accounts": hot_accounts.stats(),
+        "team_tree_cache": tree_cache.stats(),
+        "admin_stats": admin_stats.stats(),
+    }
@@ -0,0 +1,196 @@
+# app/services/admin_stats_service.py
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import AsyncSessionLocal, open_read_session
+
+logger = logging.getLogger(__name__)
+
+# Every admin dashboard figure in one statement: one pass over users, one
+# over the referral bonuses (grouped per user, so every admin's own total
+# comes out of the same pass), one pending-withdrawals count. Hot-account
+# credits still waiting in pending_credits are owed to their users, so
+# they count towards the protocol balance before they are folded.
+ADMIN_STATS_QUERY = text("""
+    WITH u AS (
+        SELECT COUNT(*) AS total_users,
+               COALESCE(SUM(balance), 0) AS protocol_balance,
+               COALESCE(array_agg(id) FILTER (WHERE role = 'admin'), '{}') AS admin_ids
+        FROM users
+    ),
+    ref AS (
+        SELECT t.user_id, SUM(t.amount) AS earned
+        FROM transactions t
+        WHERE t.type = 'referral_bonus'
+        GROUP BY t.user_id
+    )
+    SELECT u.total_users,
+           u.protocol_balance
+               + (SELECT COALESCE(SUM(amount_minor), 0) FROM pending_credits)::numeric / 100 AS protocol_balance,
+           (SELECT COALESCE(SUM(earned), 0) FROM ref) AS total_user_referral_earnings,
+           (
+               SELECT COALESCE(jsonb_object_agg(ref.user_id, ref.earned), '{}'::jsonb)
+               FROM ref
+               WHERE ref.user_id = ANY(u.admin_ids)
+           ) AS admin_referral_earnings,
+           (SELECT COUNT(*) FROM withdrawals WHERE status = 'pending') AS pending_withdrawals_count,
+           now() AS as_of
+    FROM u
+""")
+
+
+# The computed figures are shared through the single admin_stats_snapshot
+# row; recomputing it is serialised across workers by an advisory lock.
+SNAPSHOT_LOCK_QUERY = text("SELECT pg_advisory_xact_lock(hashtext('admin_stats_snapshot'), 0)")
+SNAPSHOT_TRY_LOCK_QUERY = text("SELECT pg_try_advisory_xact_lock(hashtext('admin_stats_snapshot'), 0)")
+
+SNAPSHOT_READ_QUERY = text("""
+    SELECT data, as_of, EXTRACT(EPOCH FROM now() - as_of) AS age_seconds
+    FROM admin_stats_snapshot
+    WHERE id = 1
+""")
+
+SNAPSHOT_WRITE_QUERY = text("""
+    INSERT INTO admin_stats_snapshot (id, data, as_of)
+    VALUES (1, CAST(:data AS jsonb), :as_of)
+    ON CONFLICT (id) DO UPDATE SET data = EXCLUDED.data, as_of = EXCLUDED.as_of
+""")
+
+
+def _json(value):
+    return json.loads(value) if isinstance(value, str) else value
+
+
+class AdminStatsSnapshot:
+    """
+    Admin dashboard aggregates, recomputed every ``refresh_interval``
+    seconds and stored in ``admin_stats_snapshot`` for every worker.
+
+    Each worker runs the refresher loop, but only the one holding the
+    advisory lock recomputes, and only when the stored row is at least half
+    an interval old, so the scans run about once per interval in total.
+    Requests serve a local copy of the row, re-read (one primary key lookup)
+    once it is ``refresh_interval`` old. Only when the stored row is missing
+    or older than ``max_age`` (e.g. every refresher is failing) does a
+    request recompute inline; concurrent requests then wait for a single
+    refresh instead of each running the scans.
+    """
+
+    def __init__(self, refresh_interval: float, max_age: float):
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self._snapshot: Optional[dict] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+        # Metrics
+        self.loads = 0
+        self.refreshes = 0
+        self.inline_refreshes = 0
+        self.last_refresh_ms: Optional[float] = None
+
+    async def compute(self) -> dict:
+        started = time.perf_counter()
+        async with open_read_session() as db:
+            row = (await db.execute(ADMIN_STATS_QUERY)).fetchone()
+
+        snapshot = {
+            "total_users": row.total_users,
+            "total_user_referral_earnings": str(row.total_user_referral_earnings),
+            "admin_referral_earnings": {str(k): str(v) for k, v in _json(row.admin_referral_earnings).items()},
+            "pending_withdrawals_count": row.pending_withdrawals_count,
+            "protocol_balance": str(row.protocol_balance),
+            "as_of": row.as_of,
+        }
+        self.refreshes += 1
+        self.last_refresh_ms = round((time.perf_counter() - started) * 1000, 3)
+        return snapshot
+
+    def _use(self, snapshot: dict) -> dict:
+        self._snapshot = snapshot
+        self._loaded_at = time.monotonic()
+        return snapshot
+
+    async def load(self, primary: bool = False) -> Optional[float]:
+        """Take the stored snapshot as the local copy; returns its age in seconds, None if there is none."""
+        async with open_read_session(primary=primary) as db:
+            row = (await db.execute(SNAPSHOT_READ_QUERY)).fetchone()
+        self.loads += 1
+        if row is None:
+            return None
+        self._use({**_json(row.data), "as_of": row.as_of})
+        return float(row.age_seconds)
+
+    async def refresh(self, min_age: float = 0.0, wait: bool = False) -> Optional[dict]:
+        """
+        Recompute and store the snapshot unless the stored one is younger
+        than ``min_age`` seconds. Without ``wait``, gives up when another
+        worker is already refreshing. Returns the new snapshot, or None if
+        nothing was recomputed.
+        """
+        async with AsyncSessionLocal() as db:
+            if wait:
+                await db.execute(SNAPSHOT_LOCK_QUERY)
+            elif not (await db.execute(SNAPSHOT_TRY_LOCK_QUERY)).scalar():
+                return None
+
+            # Whoever held the lock before us may have just stored a fresh one
+            stored = (await db.execute(SNAPSHOT_READ_QUERY)).fetchone()
+            if stored is not None and stored.age_seconds < min_age:
+                return None
+
+            snapshot = await self.compute()
+            await db.execute(SNAPSHOT_WRITE_QUERY, {
+                "data": json.dumps({k: v for k, v in snapshot.items() if k != "as_of"}),
+                "as_of": snapshot["as_of"],
+            })
+            await db.commit()
+        return self._use(snapshot)
+
+    def _expired(self) -> bool:
+        return self._snapshot is None or time.monotonic() - self._loaded_at > self.refresh_interval
+
+    async def get(self) -> dict:
+        if self._expired():
+            async with self._lock:
+                if self._expired():
+                    age = await self.load()
+                    if age is None or age > self.max_age:
+                        self.inline_refreshes += 1
+                        if await self.refresh(min_age=self.max_age, wait=True) is None:
+                            # Another worker refreshed while we waited for the lock
+                            await self.load(primary=True)
+        return self._snapshot
+
+    async def run_refresher(self):
+        """Background loop started from app startup."""
+        while True:
+            try:
+                await self.refresh(min_age=self.refresh_interval / 2)
+            except Exception as e:
+                logger.error(f"❌ Failed to refresh admin stats snapshot: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def stats(self) -> dict:
+        as_of = self._snapshot["as_of"] if self._snapshot else None
+        return {
+            "as_of": as_of.isoformat() if as_of else None,
+            "age_seconds": round((datetime.now(timezone.utc) - as_of).total_seconds(), 3) if as_of else None,
+            "loads": self.loads,
+            "refreshes": self.refreshes,
+            "inline_refreshes": self.inline_refreshes,
+            "last_refresh_ms": self.last_refresh_ms,
+        }
+
+
+admin_stats = AdminStatsSnapshot(
+    refresh_interval=settings.ADMIN_STATS_REFRESH_INTERVAL_SECONDS,
+    max_age=settings.ADMIN_STATS_MAX_AGE_SECONDS,
+)
@@ -2,25 +2,33 @@ from fastapi import Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from uuid import uuid4
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from jose import jwt, JWTError
 import stripe
+import logging
 
 from app.schemas.auth_schemas import (
     LoginRequest,
     InitiateRegistrationRequest,
     InitiateRegistrationResponse,
     TwoFAVerifyRequest,
+    RefreshTokenRequest,
     PasswordResetRequest,
     PasswordResetConfirmRequest,
     TokenResponse,
     TwoFARequiredResponse,
 )
-from app.database import get_db
-from app.utils.security import hash_password, verify_password
-from app.utils.jwt_handler import create_access_token, create_refresh_token
+from app.database import get_db, AsyncSessionLocal
+from app.utils.background import spawn
+from app.utils.security import hash_password_async, verify_password_async, password_needs_rehash
+from app.utils.jwt_handler import create_access_token, create_refresh_token, TOKEN_ONLY_CLAIMS
+from app.services.revocation_service import revocations
+from app.dependencies.auth import load_principal
 from app.config import settings
 
 
+logger = logging.getLogger(__name__)
+
 # -----------------------------
 # STRIPE INIT
 # -----------------------------
@@ -35,9 +43,13 @@ async def login(payload: LoginRequest, db: AsyncSession = Depends(get_db)):
     result = await db.execute(query, {"email": payload.email})
     user = result.fetchone()
 
-    if not user or not verify_password(payload.password, user.password_hash):
+    if not user or not await verify_password_async(payload.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
+    # Upgrade hashes made with an older/lower bcrypt cost, off the request path
+    if password_needs_rehash(user.password_hash):
+        spawn(_rehash_password(str(user.id), payload.password, user.password_hash))
+
     # If 2FA is enabled, require second step
     if user.is_2fa_enabled:
         return TwoFARequiredResponse(two_factor_required=True, user_id=str(user.id))
@@ -56,6 +68,18 @@ async def login(payload: LoginRequest, db: AsyncSession = Depends(get_db)):
     return TokenResponse(access=access, refresh=refresh)
 
 
+async def _rehash_password(user_id: str, password: str, old_hash: str):
+    new_hash = await hash_password_async(password)
+    async with AsyncSessionLocal() as session:
+        # Only replace the exact hash we verified against (skip if the password changed meanwhile)
+        await session.execute(
+            text("UPDATE users SET password_hash = :new WHERE id = :id AND password_hash = :old"),
+            {"new": new_hash, "id": user_id, "old": old_hash},
+        )
+        await session.commit()
+    logger.info(f"🔐 Rehashed password for user {user_id} with current bcrypt cost")
+
+
 # -----------------------------
 # INITIATE REGISTRATION (Step 1)
 # -----------------------------
@@ -86,7 +110,7 @@ async def initiate_registration(
         )
 
     # Hash password & prepare pending registration
-    hashed_pw = hash_password(payload.password)
+    hashed_pw = await hash_password_async(payload.password)
     pending_id = str(uuid4())
 
     # Use Python for consistency (avoid DB timezone mismatch)
@@ -164,6 +188,66 @@ async def verify_2fa(payload: TwoFAVerifyRequest, db: AsyncSession = Depends(get
     return TokenResponse(access=access, refresh=refresh)
 
 
+# -----------------------------
+# REFRESH TOKENS
+# -----------------------------
+def _decode_refresh_token(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+
+    if payload.get("type") != "refresh" or not payload.get("jti") or "sub" not in payload:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return payload
+
+
+async def refresh(payload: RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Rotate a refresh token: the presented one is revoked and a new
+    access/refresh pair is issued. The user must still exist and be active
+    (checked through the principal cache, so usually no DB lookup); the
+    revocation store is only queried when its filter reports a possible hit.
+    """
+    claims = _decode_refresh_token(payload.refresh)
+
+    # Reserved before the first await, so a token replayed concurrently to
+    # this worker can't be rotated twice
+    if not revocations.claim(claims["jti"]):
+        raise HTTPException(status_code=401, detail="Refresh token has been revoked")
+    try:
+        if await revocations.is_revoked(claims["jti"], db):
+            raise HTTPException(status_code=401, detail="Refresh token has been revoked")
+
+        principal = await load_principal(claims["sub"], db)
+        if principal is None or principal["status"] != "active":
+            raise HTTPException(status_code=401, detail="User not found or not active")
+
+        revocations.revoke(claims["jti"], datetime.fromtimestamp(claims["exp"], tz=timezone.utc))
+    finally:
+        revocations.release(claims["jti"])
+
+    # Carry the current identity, not whatever the old token said
+    token_data = {k: v for k, v in claims.items() if k not in TOKEN_ONLY_CLAIMS}
+    token_data.update({
+        "sub": principal["id"],
+        "email": principal["email"],
+        "username": principal["username"],
+        "role": principal["role"],
+    })
+    access = create_access_token(
+        token_data, timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = create_refresh_token(token_data)
+    return TokenResponse(access=access, refresh=refresh_token)
+
+
+async def logout(payload: RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
+    claims = _decode_refresh_token(payload.refresh)
+    revocations.revoke(claims["jti"], datetime.fromtimestamp(claims["exp"], tz=timezone.utc))
+    return {"message": "Logged out successfully"}
+
+
 # -----------------------------
 # PASSWORD RESET
 # -----------------------------
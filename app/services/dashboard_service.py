@@ -1,7 +1,8 @@
 # app/services/dashboard_service.py
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
 from app.schemas.dashboard_schemas import UserDashboardStatsResponse
+from app.services.user_stats_service import get_user_stats
+from app.utils.common import from_minor_units
 
 
 async def get_user_dashboard_stats(user: dict, db: AsyncSession) -> UserDashboardStatsResponse:
@@ -9,29 +10,14 @@ async def get_user_dashboard_stats(user: dict, db: AsyncSession) -> UserDashboar
     Return dashboard statistics for a specific user.
     """
 
-    # Total earnings (sum of user’s transactions)
-    res_earn = await db.execute(
-        text("SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE user_id = :uid"),
-        {"uid": user["id"]}
-    )
-    total_earnings = float(res_earn.scalar() or 0)
-
-    # Direct referrals
-    res_direct = await db.execute(
-        text("""
-            SELECT COUNT(*) 
-            FROM users 
-            WHERE referred_by_code = (SELECT referral_code FROM users WHERE id = :uid)
-        """),
-        {"uid": user["id"]}
-    )
-    direct_referrals = res_direct.scalar() or 0
-
-    # Team size (currently only direct referrals, can be recursive if needed)
-    total_team_size = direct_referrals
+    # Primary-key reads of the incrementally maintained counters
+    stats = await get_user_stats(db, user["id"])
+    if stats is None:
+        return UserDashboardStatsResponse(totalEarnings=0, totalTeamSize=0, directReferrals=0)
 
     return UserDashboardStatsResponse(
-        totalEarnings=total_earnings,
-        totalTeamSize=total_team_size,
-        directReferrals=direct_referrals
+        totalEarnings=float(from_minor_units(stats.lifetime_earnings_minor)),
+        totalTeamSize=stats.total_team_size,
+        directReferrals=stats.direct_referrals,
+        pendingWithdrawals=float(from_minor_units(stats.pending_withdrawals_minor)),
     )
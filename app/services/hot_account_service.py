@@ -0,0 +1,174 @@
+# app/services/hot_account_service.py
+import asyncio
+import logging
+import random
+import time
+from typing import List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.services.ledger_service import post_entries
+
+logger = logging.getLogger(__name__)
+
+# How long resolved account ids are trusted before re-reading the codes
+RESOLVE_TTL_SECONDS = 60
+
+
+class HotAccounts:
+    """
+    Deferred crediting for accounts that sit in almost every upline
+    (MASTERKEY and the top of the referral tree).
+
+    Instead of locking the account's user row on every signup, credits are
+    appended to ``pending_credits`` under a random shard. A background folder
+    drains each shard in batches and posts the credits to the ledger with one
+    row lock per batch. Every credit still becomes its own ledger entry, and
+    balance reads add whatever is still pending, so totals stay exact.
+    """
+
+    def __init__(self, enabled: bool, codes: List[str], shards: int, batch_size: int):
+        self.enabled = enabled
+        self.codes = sorted(set(codes))
+        self.shards = shards
+        self.batch_size = batch_size
+        self._ids: Set[str] = set()
+        self._resolved_at = 0.0
+        self._fold_lock = asyncio.Lock()
+
+        # Metrics
+        self.deferred = 0
+        self.folded = 0
+        self.folds = 0
+        self.last_fold_ms: Optional[float] = None
+
+    # -----------------------------
+    # Routing
+    # -----------------------------
+    async def hot_ids(self, db: AsyncSession) -> Set[str]:
+        if not self.enabled:
+            return set()
+        if time.monotonic() - self._resolved_at >= RESOLVE_TTL_SECONDS:
+            result = await db.execute(
+                text("SELECT id FROM users WHERE referral_code = ANY(:codes)"), {"codes": self.codes}
+            )
+            self._ids = {str(r.id) for r in result.fetchall()}
+            self._resolved_at = time.monotonic()
+        return self._ids
+
+    async def split(self, db: AsyncSession, entries: List[dict]) -> tuple[List[dict], List[dict]]:
+        """(entries to post now, credits to defer)."""
+        hot = await self.hot_ids(db)
+        if not hot:
+            return entries, []
+        deferred = [e for e in entries if e["user_id"] in hot and e["amount_minor"] > 0]
+        direct = [e for e in entries if not (e["user_id"] in hot and e["amount_minor"] > 0)]
+        return direct, deferred
+
+    async def defer(self, db: AsyncSession, entries: List[dict]) -> None:
+        """Append credits to pending_credits in the caller's transaction (no row locks)."""
+        if not entries:
+            return
+        await db.execute(
+            text("""
+                INSERT INTO pending_credits (shard, user_id, entry_type, amount_minor, earning_minor, transaction_id)
+                VALUES (:shard, :user_id, :entry_type, :amount_minor, :earning_minor, :transaction_id)
+            """),
+            [
+                {
+                    "shard": random.randrange(self.shards),
+                    "user_id": e["user_id"],
+                    "entry_type": e["entry_type"],
+                    "amount_minor": e["amount_minor"],
+                    "earning_minor": e["earning_minor"],
+                    "transaction_id": e["transaction_id"],
+                }
+                for e in entries
+            ],
+        )
+        self.deferred += len(entries)
+
+    # -----------------------------
+    # Folding
+    # -----------------------------
+    async def fold_shard(self, shard: int) -> int:
+        async with AsyncSessionLocal() as session:
+            # Another worker process is already folding this shard
+            locked = await session.execute(
+                text("SELECT pg_try_advisory_xact_lock(hashtext('pending_credits'), :shard)"), {"shard": shard}
+            )
+            if not locked.scalar():
+                return 0
+
+            result = await session.execute(
+                text("""
+                    DELETE FROM pending_credits
+                    WHERE id IN (
+                        SELECT id FROM pending_credits
+                        WHERE shard = :shard
+                        ORDER BY id
+                        LIMIT :batch
+                    )
+                    RETURNING id, user_id, entry_type, amount_minor, earning_minor, transaction_id
+                """),
+                {"shard": shard, "batch": self.batch_size},
+            )
+            rows = sorted(result.fetchall(), key=lambda r: r.id)
+            if not rows:
+                return 0
+
+            await post_entries(session, [
+                {
+                    "user_id": str(r.user_id),
+                    "entry_type": r.entry_type,
+                    "amount_minor": r.amount_minor,
+                    "earning_minor": r.earning_minor,
+                    "transaction_id": str(r.transaction_id) if r.transaction_id else None,
+                    "withdrawal_id": None,
+                }
+                for r in rows
+            ])
+            await session.commit()
+            return len(rows)
+
+    async def fold_all(self) -> int:
+        async with self._fold_lock:
+            started = time.perf_counter()
+            folded = 0
+            for shard in range(self.shards):
+                folded += await self.fold_shard(shard)
+            self.folded += folded
+            self.folds += 1
+            self.last_fold_ms = round((time.perf_counter() - started) * 1000, 3)
+            return folded
+
+    async def run_folder(self):
+        """Background loop started from app startup."""
+        while True:
+            await asyncio.sleep(settings.HOT_ACCOUNT_FOLD_INTERVAL_SECONDS)
+            try:
+                await self.fold_all()
+            except Exception as e:
+                logger.error(f"❌ Failed to fold pending hot-account credits: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "codes": self.codes,
+            "shards": self.shards,
+            "deferred": self.deferred,
+            "folded": self.folded,
+            "folds": self.folds,
+            "last_fold_ms": self.last_fold_ms,
+        }
+
+
+hot_accounts = HotAccounts(
+    enabled=settings.HOT_ACCOUNT_MODE,
+    codes=[settings.MASTER_REFERRAL_CODE, *settings.HOT_ACCOUNT_CODES],
+    shards=settings.HOT_ACCOUNT_SHARDS,
+    batch_size=settings.HOT_ACCOUNT_FOLD_BATCH_SIZE,
+)
@@ -0,0 +1,241 @@
+# app/services/ledger_service.py
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from app.utils.common import to_minor_units, from_minor_units
+from app.services import user_stats_service
+
+# Entry types that count towards lifetime earnings
+EARNING_ENTRY_TYPES = ("referral_bonus", "admin_credit")
+# Entry types that open (hold, negative amount) or close (release) a pending withdrawal
+PENDING_WITHDRAWAL_ENTRY_TYPES = ("withdrawal_hold", "withdrawal_release")
+
+
+# -----------------------------
+# ENTRIES
+# -----------------------------
+def ledger_entry(
+    user_id: str,
+    entry_type: str,
+    amount,
+    *,
+    transaction_id: Optional[str] = None,
+    withdrawal_id: Optional[str] = None,
+) -> dict:
+    """
+    One ledger line. ``amount`` is in major units and signed: credits are
+    positive, debits (withdrawal holds) negative.
+    """
+    amount_minor = to_minor_units(amount)
+    return {
+        "user_id": str(user_id),
+        "entry_type": entry_type,
+        "amount_minor": amount_minor,
+        "earning_minor": amount_minor if entry_type in EARNING_ENTRY_TYPES else 0,
+        "transaction_id": str(transaction_id) if transaction_id else None,
+        "withdrawal_id": str(withdrawal_id) if withdrawal_id else None,
+    }
+
+
+def stats_deltas(entries: List[dict]) -> dict:
+    """user_stats deltas (lifetime earnings, pending withdrawals) implied by ``entries``."""
+    earnings: Dict[str, int] = {}
+    pending_withdrawals: Dict[str, int] = {}
+    for entry in entries:
+        uid = entry["user_id"]
+        earnings[uid] = earnings.get(uid, 0) + entry["earning_minor"]
+        if entry["entry_type"] in PENDING_WITHDRAWAL_ENTRY_TYPES:
+            pending_withdrawals[uid] = pending_withdrawals.get(uid, 0) - entry["amount_minor"]
+    return {"earnings": earnings, "pending_withdrawals": pending_withdrawals}
+
+
+async def post_entries(db: AsyncSession, entries: List[dict], update_stats: bool = True) -> Dict[str, int]:
+    """
+    Append ``entries`` to the ledger in the caller's transaction.
+
+    Every affected user row is locked first (in id order) and its
+    ``users.balance`` mirror moved by the same amount, so postings for one
+    user are serialized and each new entry can carry the running balance
+    and lifetime earnings on top of that user's previous entry. The
+    user_stats counters move in the same transaction unless the caller
+    batches them itself (``update_stats=False``).
+
+    Raises 400 if a debit would take a balance below zero. Hot-account
+    credits still waiting in pending_credits count towards that balance
+    (they are owed and can only be folded in, never taken back), so a hot
+    account can spend them before the folder catches up; its ledger and
+    ``users.balance`` may then dip below zero until the fold lands. The
+    pending sum is only read for users a debit would overdraw. Returns the
+    new ledger balance (minor units) per user.
+    """
+    if not entries:
+        return {}
+
+    deltas: Dict[str, int] = {}
+    for entry in entries:
+        deltas[entry["user_id"]] = deltas.get(entry["user_id"], 0) + entry["amount_minor"]
+
+    await _lock_and_mirror(db, deltas)
+    if update_stats:
+        await user_stats_service.apply_deltas(db, **stats_deltas(entries))
+    rows = await _append(db, entries)
+
+    # Lowest ledger balance a debit leaves per user, where it is negative
+    shortfalls: Dict[str, int] = {}
+    for r in rows:
+        if r.amount_minor < 0 and r.balance_after_minor < 0:
+            uid = str(r.user_id)
+            shortfalls[uid] = min(shortfalls.get(uid, 0), r.balance_after_minor)
+    if shortfalls:
+        pending = await _pending_credit_totals(db, list(shortfalls))
+        if any(lowest + pending.get(uid, 0) < 0 for uid, lowest in shortfalls.items()):
+            raise HTTPException(status_code=400, detail="Insufficient balance")
+
+    balances: Dict[str, int] = {}
+    for r in rows:  # ordered by id, so the last row per user wins
+        balances[str(r.user_id)] = r.balance_after_minor
+    return balances
+
+
+async def post_entry(
+    db: AsyncSession,
+    user_id: str,
+    entry_type: str,
+    amount,
+    *,
+    transaction_id: Optional[str] = None,
+    withdrawal_id: Optional[str] = None,
+) -> int:
+    """Single-entry shorthand for ``post_entries``. Returns the new balance in minor units."""
+    entry = ledger_entry(user_id, entry_type, amount, transaction_id=transaction_id, withdrawal_id=withdrawal_id)
+    balances = await post_entries(db, [entry])
+    return balances[entry["user_id"]]
+
+
+async def _lock_and_mirror(db: AsyncSession, deltas: Dict[str, int]) -> None:
+    params = {}
+    values = []
+    for i, (uid, amt) in enumerate(sorted(deltas.items())):
+        params[f"uid_{i}"] = uid
+        params[f"amt_{i}"] = amt
+        values.append(f"(CAST(:uid_{i} AS uuid), CAST(:amt_{i} AS bigint))")
+
+    await db.execute(
+        text(f"""
+            WITH deltas (id, amt_minor) AS (VALUES {", ".join(values)}),
+            locked AS (
+                SELECT u.id FROM users u
+                WHERE u.id IN (SELECT id FROM deltas)
+                ORDER BY u.id
+                FOR UPDATE
+            )
+            UPDATE users u
+            SET balance = u.balance + d.amt_minor::numeric / 100
+            FROM deltas d
+            WHERE u.id = d.id AND u.id IN (SELECT id FROM locked)
+        """),
+        params,
+    )
+
+
+async def _pending_credit_totals(db: AsyncSession, user_ids: List[str]) -> Dict[str, int]:
+    # The folder deletes a batch before it locks the users rows we hold, so
+    # credits it is folding right now are still visible here, uncommitted
+    result = await db.execute(
+        text("""
+            SELECT user_id, SUM(amount_minor) AS amount_minor
+            FROM pending_credits
+            WHERE user_id = ANY(CAST(:uids AS uuid[]))
+            GROUP BY user_id
+        """),
+        {"uids": user_ids},
+    )
+    return {str(r.user_id): int(r.amount_minor) for r in result.fetchall()}
+
+
+async def _append(db: AsyncSession, entries: List[dict]):
+    # Running totals: previous head entry per user + window sum over the new
+    # entries in posting order. Rows are inserted in that order too, so the
+    # highest id per user is always its current head.
+    params = {}
+    values = []
+    for i, entry in enumerate(entries):
+        params.update({f"{key}_{i}": value for key, value in entry.items()})
+        params[f"seq_{i}"] = i
+        values.append(
+            f"(CAST(:seq_{i} AS integer), CAST(:user_id_{i} AS uuid), CAST(:entry_type_{i} AS text), "
+            f"CAST(:amount_minor_{i} AS bigint), CAST(:earning_minor_{i} AS bigint), "
+            f"CAST(:transaction_id_{i} AS uuid), CAST(:withdrawal_id_{i} AS uuid))"
+        )
+
+    result = await db.execute(
+        text(f"""
+            WITH v (seq, user_id, entry_type, amount_minor, earning_minor, transaction_id, withdrawal_id) AS (
+                VALUES {", ".join(values)}
+            ),
+            heads AS (
+                SELECT d.user_id,
+                       COALESCE(h.balance_after_minor, 0) AS balance_minor,
+                       COALESCE(h.lifetime_earnings_minor, 0) AS lifetime_minor
+                FROM (SELECT DISTINCT user_id FROM v) d
+                LEFT JOIN LATERAL (
+                    SELECT le.balance_after_minor, le.lifetime_earnings_minor
+                    FROM ledger_entries le
+                    WHERE le.user_id = d.user_id
+                    ORDER BY le.id DESC
+                    LIMIT 1
+                ) h ON true
+            )
+            INSERT INTO ledger_entries (
+                user_id, entry_type, amount_minor, balance_after_minor, lifetime_earnings_minor,
+                transaction_id, withdrawal_id
+            )
+            SELECT v.user_id, v.entry_type, v.amount_minor,
+                   h.balance_minor + SUM(v.amount_minor) OVER w,
+                   h.lifetime_minor + SUM(v.earning_minor) OVER w,
+                   v.transaction_id, v.withdrawal_id
+            FROM v
+            JOIN heads h ON h.user_id = v.user_id
+            WINDOW w AS (PARTITION BY v.user_id ORDER BY v.seq)
+            ORDER BY v.seq
+            RETURNING id, user_id, amount_minor, balance_after_minor
+        """),
+        params,
+    )
+    return sorted(result.fetchall(), key=lambda r: r.id)
+
+
+# -----------------------------
+# SNAPSHOTS
+# -----------------------------
+async def get_balance_snapshot(db: AsyncSession, user_id: str) -> Dict[str, Decimal]:
+    """
+    Current balance and lifetime earnings from the user's latest entry (one
+    index probe), plus any hot-account credits not folded in yet.
+    """
+    query = text("""
+        SELECT COALESCE(le.balance_after_minor, 0) + pc.amount_minor AS balance_minor,
+               COALESCE(le.lifetime_earnings_minor, 0) + pc.earning_minor AS lifetime_minor
+        FROM (
+            SELECT COALESCE(SUM(amount_minor), 0) AS amount_minor,
+                   COALESCE(SUM(earning_minor), 0) AS earning_minor
+            FROM pending_credits
+            WHERE user_id = :uid
+        ) pc
+        LEFT JOIN LATERAL (
+            SELECT balance_after_minor, lifetime_earnings_minor
+            FROM ledger_entries
+            WHERE user_id = :uid
+            ORDER BY id DESC
+            LIMIT 1
+        ) le ON true
+    """)
+    result = await db.execute(query, {"uid": user_id})
+    row = result.fetchone()
+    return {
+        "balance": from_minor_units(row.balance_minor),
+        "lifetime_earnings": from_minor_units(row.lifetime_minor),
+    }
@@ -0,0 +1,61 @@
+# app/services/referral_service.py
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from typing import List, Optional
+
+
+# -----------------------------
+# CLOSURE MAINTENANCE
+# -----------------------------
+async def add_user_to_closure(db: AsyncSession, user_id: str, referred_by_code: Optional[str]) -> List[str]:
+    """
+    Insert closure rows for a newly created user: itself at depth 0 and
+    every ancestor of its referrer one level deeper. Runs in the caller's
+    transaction. Returns the ancestor ids (nearest first).
+    """
+    query = text("""
+        INSERT INTO referral_closure (ancestor_id, descendant_id, depth)
+        SELECT CAST(:uid AS uuid), CAST(:uid AS uuid), 0
+        UNION ALL
+        SELECT c.ancestor_id, CAST(:uid AS uuid), c.depth + 1
+        FROM users p
+        JOIN referral_closure c ON c.descendant_id = p.id
+        WHERE p.referral_code = :code
+        RETURNING ancestor_id, depth
+    """)
+    result = await db.execute(query, {"uid": user_id, "code": referred_by_code})
+    rows = sorted(result.fetchall(), key=lambda r: r.depth)
+    return [str(r.ancestor_id) for r in rows if r.depth > 0]
+
+
+# -----------------------------
+# LOOKUPS
+# -----------------------------
+async def get_upline_ids(db: AsyncSession, user_id: str, max_depth: Optional[int] = None) -> List[str]:
+    """Ancestor ids of a user, nearest first."""
+    query = text("""
+        SELECT ancestor_id
+        FROM referral_closure
+        WHERE descendant_id = :uid
+          AND depth >= 1
+          AND (CAST(:max_depth AS integer) IS NULL OR depth <= :max_depth)
+        ORDER BY depth
+    """)
+    result = await db.execute(query, {"uid": user_id, "max_depth": max_depth})
+    return [str(r.ancestor_id) for r in result.fetchall()]
+
+
+async def get_team_counts(db: AsyncSession, user_id: str) -> dict:
+    """Direct referrals and total downline size."""
+    query = text("""
+        SELECT
+            COUNT(*) FILTER (WHERE depth = 1) AS direct_referrals,
+            COUNT(*) FILTER (WHERE depth >= 1) AS total_team_size
+        FROM referral_closure
+        WHERE ancestor_id = :uid
+    """)
+    row = (await db.execute(query, {"uid": user_id})).fetchone()
+    return {
+        "direct_referrals": row.direct_referrals or 0,
+        "total_team_size": row.total_team_size or 0,
+    }
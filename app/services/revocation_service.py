@@ -0,0 +1,173 @@
+# app/services/revocation_service.py
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.utils.bloom import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshTokenRevocations:
+    """
+    Revoked refresh-token JTIs.
+
+    Lookups hit an in-memory Bloom filter first, so a token that was never
+    revoked is accepted without touching the DB. Only filter hits (real
+    revocations or rare false positives) are confirmed against
+    ``revoked_tokens``. New revocations are buffered and written in batches;
+    the periodic flush also pulls in revocations made by other workers.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, batch_size: int):
+        self.filter = BloomFilter(capacity, error_rate)
+        self.batch_size = batch_size
+        self._pending: dict[str, datetime] = {}
+        self._flushing: dict[str, datetime] = {}  # batch being written by flush()
+        self._rotating: set[str] = set()  # JTIs claimed by an in-progress refresh
+        self._last_synced_at: Optional[datetime] = None
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.filter_negatives = 0
+        self.filter_positives = 0
+        self.false_positives = 0
+        self.flushed = 0
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+    async def is_revoked(self, jti: str, db: AsyncSession) -> bool:
+        if not self.filter.might_contain(jti):
+            self.filter_negatives += 1
+            return False
+
+        self.filter_positives += 1
+        if jti in self._pending or jti in self._flushing:
+            return True
+
+        result = await db.execute(
+            text("SELECT 1 FROM revoked_tokens WHERE jti = :jti LIMIT 1"), {"jti": jti}
+        )
+        if result.fetchone():
+            return True
+
+        self.false_positives += 1
+        return False
+
+    def claim(self, jti: str) -> bool:
+        """
+        Reserve ``jti`` for one refresh in this worker. Synchronous, so it must
+        run before the caller's first await: of two concurrent rotations of
+        the same token only the first gets True. Already revoked tokens that
+        this worker hasn't flushed yet are refused here too; older ones are
+        caught by ``is_revoked``. Pair with ``release``.
+        """
+        if jti in self._rotating or jti in self._pending or jti in self._flushing:
+            return False
+        self._rotating.add(jti)
+        return True
+
+    def release(self, jti: str):
+        self._rotating.discard(jti)
+
+    def revoke(self, jti: str, expires_at: datetime):
+        self.filter.add(jti)
+        self._pending[jti] = expires_at
+        if len(self._pending) >= self.batch_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    async def load(self):
+        """Rebuild the filter from every still-unexpired revocation."""
+        async with AsyncSessionLocal() as session:
+            await self._sync(session, since=None)
+
+    async def _sync(self, session: AsyncSession, since: Optional[datetime]):
+        if since is None:
+            query = text("SELECT jti, revoked_at FROM revoked_tokens WHERE expires_at > now()")
+            result = await session.execute(query)
+        else:
+            query = text("SELECT jti, revoked_at FROM revoked_tokens WHERE revoked_at > :since")
+            result = await session.execute(query, {"since": since})
+
+        for row in result.fetchall():
+            self.filter.add(row.jti)
+            if self._last_synced_at is None or row.revoked_at > self._last_synced_at:
+                self._last_synced_at = row.revoked_at
+
+    async def flush(self):
+        async with self._flush_lock:
+            batch, self._pending = self._pending, {}
+            self._flushing = batch
+            try:
+                async with AsyncSessionLocal() as session:
+                    if batch:
+                        await session.execute(
+                            text("""
+                                INSERT INTO revoked_tokens (jti, expires_at)
+                                VALUES (:jti, :expires_at)
+                                ON CONFLICT (jti) DO NOTHING
+                            """),
+                            [{"jti": jti, "expires_at": exp} for jti, exp in batch.items()],
+                        )
+                        await session.commit()
+                        self.flushed += len(batch)
+
+                    # Overlap the window so rows from slow concurrent commits aren't missed
+                    since = self._last_synced_at
+                    if since is not None:
+                        since -= timedelta(seconds=30)
+                    await self._sync(session, since=since)
+            except Exception:
+                # Keep unsaved revocations for the next round
+                for jti, exp in batch.items():
+                    self._pending.setdefault(jti, exp)
+                raise
+            finally:
+                self._flushing = {}
+
+    async def prune_expired(self):
+        async with AsyncSessionLocal() as session:
+            await session.execute(text("DELETE FROM revoked_tokens WHERE expires_at < now()"))
+            await session.commit()
+
+    async def run_flusher(self):
+        """Background loop started from app startup."""
+        last_pruned = datetime.now(timezone.utc)
+        while True:
+            await asyncio.sleep(settings.REVOCATION_FLUSH_INTERVAL_SECONDS)
+            try:
+                await self.flush()
+                if datetime.now(timezone.utc) - last_pruned > timedelta(hours=1):
+                    await self.prune_expired()
+                    last_pruned = datetime.now(timezone.utc)
+            except Exception as e:
+                logger.error(f"❌ Failed to flush revoked refresh tokens: {e}")
+
+    def stats(self) -> dict:
+        return {
+            **self.filter.stats(),
+            "pending": len(self._pending),
+            "rotating": len(self._rotating),
+            "flushed": self.flushed,
+            "filter_negatives": self.filter_negatives,
+            "filter_positives": self.filter_positives,
+            "false_positives": self.false_positives,
+        }
+
+
+revocations = RefreshTokenRevocations(
+    capacity=settings.REVOCATION_FILTER_CAPACITY,
+    error_rate=settings.REVOCATION_FILTER_ERROR_RATE,
+    batch_size=settings.REVOCATION_BATCH_SIZE,
+)
@@ -0,0 +1,161 @@
+# app/services/rollup_service.py
+import random
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+from app.config import settings
+from app.utils.common import to_minor_units, from_minor_units
+
+# daily_rollups holds per-day counts and volumes, upserted by the write
+# paths in the same transaction as the rows they count, so range queries
+# never touch the raw tables. Every (day, metric, currency) is spread over
+# ROLLUP_SHARDS rows: a transaction adds to one random shard, readers sum
+# them. Upserts run last in their transaction (after any users, user_stats
+# and team counter locks) and in key order, so concurrent writers can't
+# deadlock. Writers hold a shared advisory lock on each day they touch, the
+# rebuild command an exclusive one on the day it recomputes, so a rebuild
+# only ever holds up writes to that day.
+
+SIGNUP = "signup"
+WITHDRAWAL_REQUEST = "withdrawal_request"
+WITHDRAWAL_APPROVED = "withdrawal_approved"
+
+# Completed transaction types that are rolled up, and the metric they count as
+TRANSACTION_METRICS = {
+    "referral_bonus": "referral_bonus",
+    "admin_credit": "admin_credit",
+    "withdrawal": WITHDRAWAL_APPROVED,
+}
+
+# Currency key of count-only metrics (signups), and of money rows stored
+# without one (withdrawals requested through /withdrawals/ are paid in usd)
+NO_CURRENCY = ""
+DEFAULT_CURRENCY = "usd"
+
+
+# -----------------------------
+# EVENTS
+# -----------------------------
+def rollup_event(metric: str, currency: Optional[str] = NO_CURRENCY, amount=0, *, day: Optional[date] = None) -> dict:
+    """One counted occurrence of ``metric`` (``amount`` in major units), on ``day`` (UTC, default today)."""
+    return {
+        "day": day or datetime.utcnow().date(),
+        "metric": metric,
+        "currency": (DEFAULT_CURRENCY if currency is None else currency).lower(),
+        "count": 1,
+        "amount_minor": to_minor_units(amount) if amount else 0,
+    }
+
+
+def transaction_event(row: dict) -> Optional[dict]:
+    """Rollup event for a ``build_transaction_row`` row, or None if its type isn't rolled up."""
+    metric = TRANSACTION_METRICS.get(row["type"])
+    if metric is None or row["status"] != "completed":
+        return None
+    return rollup_event(metric, row["cur"], row["amt"], day=row["dt"].date())
+
+
+# -----------------------------
+# WRITE
+# -----------------------------
+# Shared per-day advisory locks, in key order (namespace, day ordinal)
+DAY_LOCK_QUERY = text("""
+    SELECT pg_advisory_xact_lock_shared(hashtext('daily_rollups'), s.day_key)
+    FROM (SELECT DISTINCT unnest(CAST(:day_keys AS integer[])) AS day_key ORDER BY 1) s
+""")
+
+
+def day_lock_key(day: date) -> int:
+    return day.toordinal()
+
+
+async def record(db: AsyncSession, events: List[dict]) -> None:
+    """
+    Add ``events`` to the rollups in the caller's transaction with one
+    upsert, after taking the shared locks of their days. Call it once per
+    transaction, after its other writes.
+    """
+    totals: Dict[Tuple[date, str, str], List[int]] = {}
+    for event in events:
+        if event is None:
+            continue
+        key = (event["day"], event["metric"], event["currency"])
+        total = totals.setdefault(key, [0, 0])
+        total[0] += event["count"]
+        total[1] += event["amount_minor"]
+    if not totals:
+        return
+
+    # Waits only while the rebuild command is recomputing one of these days
+    await db.execute(DAY_LOCK_QUERY, {"day_keys": sorted({day_lock_key(day) for day, _, _ in totals})})
+
+    shard = random.randrange(max(settings.ROLLUP_SHARDS, 1))
+    params = {"shard": shard}
+    values = []
+    for i, (day, metric, currency) in enumerate(sorted(totals)):
+        params.update({
+            f"day_{i}": day,
+            f"metric_{i}": metric,
+            f"cur_{i}": currency,
+            f"n_{i}": totals[(day, metric, currency)][0],
+            f"amt_{i}": totals[(day, metric, currency)][1],
+        })
+        values.append(
+            f"(CAST(:day_{i} AS date), CAST(:metric_{i} AS text), CAST(:cur_{i} AS text), "
+            f"CAST(:shard AS smallint), CAST(:n_{i} AS bigint), CAST(:amt_{i} AS bigint))"
+        )
+
+    await db.execute(
+        text(f"""
+            INSERT INTO daily_rollups (day, metric, currency, shard, count, amount_minor)
+            VALUES {", ".join(values)}
+            ON CONFLICT (day, metric, currency, shard) DO UPDATE
+            SET count = daily_rollups.count + EXCLUDED.count,
+                amount_minor = daily_rollups.amount_minor + EXCLUDED.amount_minor,
+                updated_at = now()
+        """),
+        params,
+    )
+
+
+# -----------------------------
+# READ
+# -----------------------------
+async def get_daily(
+    db: AsyncSession,
+    date_from: date,
+    date_to: date,
+    metric: Optional[str] = None,
+    currency: Optional[str] = None,
+) -> List[dict]:
+    """Per-day totals between ``date_from`` and ``date_to`` (inclusive), shards summed."""
+    result = await db.execute(
+        text("""
+            SELECT day, metric, currency, SUM(count) AS count, SUM(amount_minor) AS amount_minor
+            FROM daily_rollups
+            WHERE day BETWEEN :date_from AND :date_to
+              AND (CAST(:metric AS text) IS NULL OR metric = :metric)
+              AND (CAST(:currency AS text) IS NULL OR currency = :currency)
+            GROUP BY day, metric, currency
+            ORDER BY day, metric, currency
+        """),
+        {
+            "date_from": date_from,
+            "date_to": date_to,
+            "metric": metric,
+            "currency": currency.lower() if currency else None,
+        },
+    )
+    return [
+        {
+            "day": r.day,
+            "metric": r.metric,
+            "currency": r.currency or None,
+            "count": int(r.count),
+            "amount": str(from_minor_units(int(r.amount_minor))),
+        }
+        for r in result.fetchall()
+    ]
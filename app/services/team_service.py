@@ -1,67 +1,404 @@
-from fastapi import Depends, HTTPException
+import hashlib
+import json
+import time
+from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
+from typing import AsyncIterator, Iterable, List, Optional
 
-from app.database import get_db
+from app.config import settings
+from app.database import open_read_session
+from app.schemas.team_schemas import TeamStatsResponse, TeamTierStats
+from app.utils.cache import SizedLRUCache
+from app.utils.common import SIGNUP_BONUS_PERCENTAGES
+from app.utils.pagination import encode_cursor, decode_cursor
+
+# Serialized tree pages per requesting user, tagged with that user's id.
+# A signup only changes the trees of its ancestors, so the webhook drops
+# exactly those tags; the TTL bounds staleness on the other workers.
+# Misses are read from the primary (a lagging replica could still return
+# the tree from before the signup and re-cache it for the whole TTL), and a
+# page read before an invalidation of its tag is not stored.
+tree_cache = SizedLRUCache(
+    max_bytes=settings.TEAM_TREE_CACHE_MAX_BYTES,
+    ttl=settings.TEAM_TREE_CACHE_TTL_SECONDS,
+)
+# Key, headers and bookkeeping per cached page, on top of the JSON body
+ENTRY_OVERHEAD_BYTES = 512
 
 
 # -----------------------------
-# Get Referral Tree
+# Subtree query
 # -----------------------------
-async def get_referral_tree(user_id: str, db: AsyncSession = Depends(get_db)):
+# Level by level from the root, at most :child_limit children per node
+# (ordered by username, via ix_users_referred_by_username). One extra child
+# per node is fetched as a "has more" marker and never expanded. Depth is
+# bounded by :max_depth, cycles by the path array, and the whole walk by
+# :max_rows (the CTE is evaluated lazily, so the LIMIT stops it early).
+SUBTREE_QUERY = text("""
+    WITH RECURSIVE tree AS (
+        SELECT c.id, c.username, c.email, c.referral_code, c.referred_by_code, c.has_children, c.rn,
+               r.id AS parent_id, 1 AS level, ARRAY[r.id, c.id] AS path
+        FROM users r
+        CROSS JOIN LATERAL (
+            SELECT u.id, u.username, u.email, u.referral_code, u.referred_by_code,
+                   EXISTS (SELECT 1 FROM users k WHERE k.referred_by_code = u.referral_code) AS has_children,
+                   ROW_NUMBER() OVER (ORDER BY u.username) AS rn
+            FROM users u
+            WHERE u.referred_by_code = r.referral_code
+              AND (CAST(:after AS text) IS NULL OR u.username > CAST(:after AS text))
+              AND u.id <> r.id
+            ORDER BY u.username
+            LIMIT :child_limit + 1
+        ) c
+        WHERE r.id = :root_id
+
+        UNION ALL
+
+        SELECT c.id, c.username, c.email, c.referral_code, c.referred_by_code, c.has_children, c.rn,
+               t.id AS parent_id, t.level + 1, t.path || c.id
+        FROM tree t
+        CROSS JOIN LATERAL (
+            SELECT u.id, u.username, u.email, u.referral_code, u.referred_by_code,
+                   EXISTS (SELECT 1 FROM users k WHERE k.referred_by_code = u.referral_code) AS has_children,
+                   ROW_NUMBER() OVER (ORDER BY u.username) AS rn
+            FROM users u
+            WHERE u.referred_by_code = t.referral_code
+              AND u.id <> ALL(t.path)
+            ORDER BY u.username
+            LIMIT :child_limit + 1
+        ) c
+        WHERE t.level < :max_depth
+          AND t.rn <= :child_limit
+          AND t.has_children
+    )
+    SELECT id, username, email, referral_code, referred_by_code, has_children, rn, parent_id, level
+    FROM tree
+    LIMIT :max_rows
+""")
+
+
+class TreeSlice:
     """
-    Returns the referral tree for a given user as a nested structure with children.
+    A bounded slice of the downline as parallel arrays, one position per
+    node in (level, username) order, so a parent always precedes its
+    children. ``parents`` holds the parent's position (-1 for children of
+    the slice root); codes and emails aren't repeated per child link.
     """
 
-    # Fetch the user's referral_code
-    query = text("SELECT referral_code FROM users WHERE id = :id")
-    result = await db.execute(query, {"id": user_id})
-    row = result.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    referral_code = row.referral_code
-
-    # Recursive CTE to get all referrals
-    tree_query = text("""
-        WITH RECURSIVE referral_tree AS (
-            SELECT id, username, email, referral_code, referred_by_code, 1 as level
-            FROM users
-            WHERE referred_by_code = :referral_code
-            UNION ALL
-            SELECT u.id, u.username, u.email, u.referral_code, u.referred_by_code, rt.level + 1
-            FROM users u
-            INNER JOIN referral_tree rt ON u.referred_by_code = rt.referral_code
-        )
-        SELECT * FROM referral_tree ORDER BY level, username;
-    """)
+    __slots__ = (
+        "ids", "usernames", "emails", "referral_codes", "levels", "has_children",
+        "parents", "children_cursors", "root_referral_code", "next_cursor", "truncated",
+    )
 
-    result = await db.execute(tree_query, {"referral_code": referral_code})
-    rows = result.fetchall()
+    def __init__(self):
+        self.ids: List[str] = []
+        self.usernames: List[str] = []
+        self.emails: List[str] = []
+        self.referral_codes: List[str] = []
+        self.levels: List[int] = []
+        self.has_children: List[bool] = []
+        self.parents: List[int] = []
+        self.children_cursors: List[Optional[str]] = []
+        self.root_referral_code: Optional[str] = None
+        self.next_cursor: Optional[str] = None
+        self.truncated = False
+
+    def __len__(self) -> int:
+        return len(self.ids)
 
-    # Convert to dicts
-    referrals = [
-        {
-            "id": str(r.id),
-            "username": r.username,
-            "email": r.email,
-            "referral_code": r.referral_code,
-            "referred_by_code": r.referred_by_code,
-            "level": r.level,
-            "children": []  # initialize empty children list
+    def to_nested(self) -> List[dict]:
+        """The original wire format: nested dicts with ``children`` lists."""
+        nodes = []
+        roots = []
+        for i in range(len(self.ids)):
+            parent = self.parents[i]
+            node = {
+                "id": self.ids[i],
+                "username": self.usernames[i],
+                "email": self.emails[i],
+                "referral_code": self.referral_codes[i],
+                "referred_by_code": self.referral_codes[parent] if parent >= 0 else self.root_referral_code,
+                "level": self.levels[i],
+                "has_children": self.has_children[i],
+                "children": [],
+                "children_cursor": self.children_cursors[i],
+            }
+            nodes.append(node)
+            (nodes[parent]["children"] if parent >= 0 else roots).append(node)
+        return roots
+
+    def to_flat(self) -> dict:
+        """Columnar wire format: one array per field, ``parents`` as positions."""
+        return {
+            "ids": self.ids,
+            "usernames": self.usernames,
+            "emails": self.emails,
+            "referral_codes": self.referral_codes,
+            "levels": self.levels,
+            "has_children": self.has_children,
+            "parents": self.parents,
+            "children_cursors": self.children_cursors,
         }
-        for r in rows
+
+
+async def get_subtree(
+    root_id: str,
+    db: AsyncSession,
+    max_depth: int,
+    child_limit: int,
+    after: Optional[str] = None,
+    level_offset: int = 0,
+) -> TreeSlice:
+    """
+    Bounded slice of the downline below ``root_id``: the root's children
+    (after ``after``) with their subtrees.
+
+    ``next_cursor`` continues the root's remaining children and
+    ``truncated`` says whether TEAM_TREE_MAX_NODES cut the walk short. Every
+    node has a children cursor for lazy expansion through the children
+    endpoint; it is None once all of a node's children are loaded.
+    Levels count from the requesting user (``level_offset`` below the root).
+    """
+    result = await db.execute(SUBTREE_QUERY, {
+        "root_id": root_id,
+        "after": after,
+        "child_limit": child_limit,
+        "max_depth": max_depth,
+        "max_rows": settings.TEAM_TREE_MAX_NODES + 1,
+    })
+    rows = result.fetchall()
+    tree = TreeSlice()
+    tree.truncated = len(rows) > settings.TEAM_TREE_MAX_NODES
+    rows = rows[:settings.TEAM_TREE_MAX_NODES]
+    last_level = max((r.level for r in rows), default=0)
+
+    # Per position (root at -1): "has more" marker seen, last loaded child
+    position = {str(root_id): -1}
+    has_more = {-1: False}
+    last_child = {-1: None}
+    for r in sorted(rows, key=lambda r: (r.level, r.username)):
+        parent = position.get(str(r.parent_id))
+        if parent is None:
+            continue
+        if r.rn > child_limit:
+            has_more[parent] = True  # marker row, not part of the response
+            continue
+        if parent < 0:
+            tree.root_referral_code = r.referred_by_code
+
+        i = len(tree.ids)
+        position[str(r.id)] = i
+        has_more[i] = False
+        last_child[i] = None
+        last_child[parent] = r.username
+        tree.ids.append(str(r.id))
+        tree.usernames.append(r.username)
+        tree.emails.append(r.email)
+        tree.referral_codes.append(r.referral_code)
+        tree.levels.append(r.level + level_offset)
+        tree.has_children.append(r.has_children)
+        tree.parents.append(parent)
+
+    def children_cursor(i: int, depth: int, has_children: bool) -> Optional[str]:
+        # Children are fully loaded unless the node sits at max_depth, had a
+        # "has more" marker, or the node cap may have cut its level short.
+        if not has_children:
+            return None
+        incomplete = (
+            depth >= max_depth
+            or has_more[i]
+            or (tree.truncated and depth >= last_level - 1)
+        )
+        return encode_cursor({"after": last_child[i]}) if incomplete else None
+
+    tree.children_cursors = [
+        children_cursor(i, tree.levels[i] - level_offset, tree.has_children[i]) for i in range(len(tree.ids))
     ]
+    tree.next_cursor = children_cursor(-1, 0, True)
+    return tree
+
+
+# -----------------------------
+# Get Referral Tree
+# -----------------------------
+async def get_referral_tree(user_id: str, db: AsyncSession, max_depth: int, child_limit: int) -> TreeSlice:
+    """
+    Returns the top of the referral tree for a given user, ``max_depth``
+    levels deep.
+    """
+    return await get_subtree(user_id, db, max_depth=max_depth, child_limit=child_limit)
+
+
+# -----------------------------
+# Expand one node
+# -----------------------------
+async def get_tree_children(
+    user_id: str,
+    node_id: str,
+    db: AsyncSession,
+    cursor: Optional[str],
+    max_depth: int,
+    child_limit: int,
+) -> TreeSlice:
+    """Next page of ``node_id``'s children (with subtrees) for lazy expansion."""
+    # The node must be the user or part of their downline
+    in_downline = await db.execute(
+        text("""
+            SELECT depth FROM referral_closure
+            WHERE ancestor_id = :uid AND descendant_id = :node_id
+            LIMIT 1
+        """),
+        {"uid": user_id, "node_id": node_id},
+    )
+    node_depth = in_downline.scalar()
+    if node_depth is None:
+        raise HTTPException(status_code=404, detail="Node not found in your team")
+
+    after = decode_cursor(cursor).get("after")
+    return await get_subtree(
+        node_id, db, max_depth=max_depth, child_limit=child_limit, after=after, level_offset=node_depth
+    )
+
+
+# -----------------------------
+# Team statistics
+# -----------------------------
+TEAM_STATS_QUERY = text("""
+    WITH members AS (
+        SELECT depth AS tier, COUNT(*) AS members
+        FROM referral_closure
+        WHERE ancestor_id = :uid AND depth BETWEEN 1 AND :max_tier
+        GROUP BY depth
+    ),
+    earned AS (
+        SELECT tier, SUM(amount) AS earned
+        FROM transactions
+        WHERE user_id = :uid AND type = 'referral_bonus' AND tier BETWEEN 1 AND :max_tier
+        GROUP BY tier
+    ),
+    team AS (
+        SELECT COUNT(*) AS total_team_size
+        FROM referral_closure
+        WHERE ancestor_id = :uid AND depth >= 1
+    )
+    SELECT t.tier,
+           COALESCE(m.members, 0) AS members,
+           COALESCE(e.earned, 0) AS earned,
+           team.total_team_size
+    FROM generate_series(1, :max_tier) AS t(tier)
+    LEFT JOIN members m ON m.tier = t.tier
+    LEFT JOIN earned e ON e.tier = t.tier
+    CROSS JOIN team
+    ORDER BY t.tier
+""")
+
+
+async def get_team_stats(user_id: str, db: AsyncSession) -> TeamStatsResponse:
+    """Members and earned referral bonus per bonus tier plus the whole downline size, in one query."""
+    result = await db.execute(TEAM_STATS_QUERY, {"uid": user_id, "max_tier": len(SIGNUP_BONUS_PERCENTAGES)})
+    rows = result.fetchall()
+
+    return TeamStatsResponse(
+        tiers=[TeamTierStats(tier=r.tier, members=r.members, earned=str(r.earned)) for r in rows],
+        directReferrals=rows[0].members if rows else 0,
+        totalTeamSize=rows[0].total_team_size if rows else 0,
+        totalEarned=str(sum((r.earned for r in rows), 0)),
+    )
+
 
-    # Build nested tree
-    lookup = {r["referral_code"]: r for r in referrals}
-    root_nodes = []
+# -----------------------------
+# Cached pages
+# -----------------------------
+def _tree_page(tree: TreeSlice, format: str) -> dict:
+    """Serialized response plus an ETag over everything the client sees."""
+    payload = tree.to_flat() if format == "flat" else tree.to_nested()
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    digest = hashlib.blake2b(body, digest_size=12)
+    digest.update(f"|{tree.next_cursor}|{tree.truncated}".encode())
+    return {
+        "body": body,
+        "etag": f'"{digest.hexdigest()}"',
+        "next_cursor": tree.next_cursor,
+        "truncated": tree.truncated,
+    }
+
+
+async def get_referral_tree_page(user_id: str, max_depth: int, child_limit: int, format: str = "nested") -> dict:
+    """``get_referral_tree`` served from ``tree_cache``; only a miss opens a (primary) read session."""
+    user_id = str(user_id)
+    key = ("tree", user_id, max_depth, child_limit, format)
+    page = tree_cache.get(key)
+    if page is None:
+        read_at = time.monotonic()
+        async with open_read_session(primary=True) as db:
+            page = _tree_page(await get_referral_tree(user_id, db, max_depth, child_limit), format)
+        tree_cache.set(key, page, size=len(page["body"]) + ENTRY_OVERHEAD_BYTES, tags=(user_id,), read_at=read_at)
+    return page
+
+
+async def get_tree_children_page(
+    user_id: str, node_id: str, cursor: Optional[str], max_depth: int, child_limit: int, format: str = "nested"
+) -> dict:
+    """``get_tree_children`` served from ``tree_cache`` (keyed per requesting user)."""
+    user_id = str(user_id)
+    key = ("children", user_id, str(node_id), cursor, max_depth, child_limit, format)
+    page = tree_cache.get(key)
+    if page is None:
+        read_at = time.monotonic()
+        async with open_read_session(primary=True) as db:
+            tree = await get_tree_children(user_id, node_id, db, cursor, max_depth, child_limit)
+            page = _tree_page(tree, format)
+        tree_cache.set(key, page, size=len(page["body"]) + ENTRY_OVERHEAD_BYTES, tags=(user_id,), read_at=read_at)
+    return page
+
+
+def invalidate_team_trees(user_ids: Iterable[str]) -> None:
+    """Drop cached tree pages of ``user_ids`` (the ancestors of a new signup)."""
+    for user_id in user_ids:
+        tree_cache.invalidate_tag(str(user_id))
 
-    for r in referrals:
-        parent_code = r["referred_by_code"]
-        if parent_code and parent_code in lookup:
-            lookup[parent_code]["children"].append(r)
-        else:
-            root_nodes.append(r)
 
-    return root_nodes
+# -----------------------------
+# Streaming (NDJSON)
+# -----------------------------
+# Index-ordered on (ancestor_id, depth), so rows come out in level order
+# without a sort and the first ones are sent before the rest are read.
+STREAM_QUERY = text("""
+    SELECT u.id, u.username, u.email, u.referral_code, p.id AS parent_id, c.depth AS level
+    FROM referral_closure c
+    JOIN users u ON u.id = c.descendant_id
+    LEFT JOIN users p ON p.referral_code = u.referred_by_code
+    WHERE c.ancestor_id = :uid
+      AND c.depth >= 1
+      AND (CAST(:max_depth AS integer) IS NULL OR c.depth <= CAST(:max_depth AS integer))
+    ORDER BY c.depth
+""")
+
+
+async def stream_referral_tree(user_id: str, max_depth: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    The whole downline (or ``max_depth`` levels) as NDJSON, one node per
+    line in level order with its ``parent_id``; the client assembles the
+    tree. Rows come from a server-side cursor TEAM_TREE_STREAM_BATCH_SIZE at
+    a time, so memory stays flat whatever the team size. Opens its own
+    session because it runs after the request's dependencies have exited.
+    """
+    async with open_read_session() as db:
+        result = await db.stream(
+            STREAM_QUERY,
+            {"uid": user_id, "max_depth": max_depth},
+            execution_options={"yield_per": settings.TEAM_TREE_STREAM_BATCH_SIZE},
+        )
+        async for rows in result.partitions():
+            yield b"".join(
+                json.dumps({
+                    "id": str(r.id),
+                    "username": r.username,
+                    "email": r.email,
+                    "referral_code": r.referral_code,
+                    "parent_id": str(r.parent_id) if r.parent_id else None,
+                    "level": r.level,
+                }, separators=(",", ":")).encode() + b"\n"
+                for r in rows
+            )
@@ -9,15 +9,27 @@ from typing import List, Optional
 
 from app.schemas.transaction_schemas import TransactionResponse
 from app.utils.stripe_client import create_payment_intent
-from app.utils.common import generate_transaction_ref
+from app.utils.common import generate_transaction_ref, SIGNUP_BONUS_PERCENTAGES
+from app.services.ledger_service import ledger_entry, post_entries, stats_deltas
+from app.services import user_stats_service, rollup_service
+from app.services.hot_account_service import hot_accounts
 from app.config import settings  # ✅ MASTER_REFERRAL_CODE
 
 
 # -----------------------------
 # HELPER: Generic transaction logger
 # -----------------------------
-async def log_transaction(
-    db: AsyncSession,
+INSERT_TRANSACTION = text("""
+    INSERT INTO transactions (
+        id, user_id, type, amount, currency, status, reference, created_at,
+        referee_id, tier, note
+    )
+    VALUES (:id, :uid, :type, :amt, :cur, :status, :ref, :dt,
+            :referee, :tier, :note)
+""")
+
+
+def build_transaction_row(
     *,
     user_id: str,
     type: str,
@@ -27,39 +39,145 @@ async def log_transaction(
     referee_id: Optional[str] = None,
     tier: Optional[int] = None,
     note: Optional[str] = None,
-    commit: bool = True,
-) -> str:
-    """Insert a transaction into the DB and return its ID"""
-    tid = str(uuid4())
-    ref = generate_transaction_ref(type[:3].upper())
-
-    insert_q = text("""
-        INSERT INTO transactions (
-            id, user_id, type, amount, currency, status, reference, created_at,
-            referee_id, tier, note
-        )
-        VALUES (:id, :uid, :type, :amt, :cur, :status, :ref, :dt,
-                :referee, :tier, :note)
-    """)
-
-    await db.execute(insert_q, {
-        "id": tid,
+) -> dict:
+    return {
+        "id": str(uuid4()),
         "uid": user_id,
         "type": type,
         "amt": amount,
         "cur": currency,
         "status": status,
-        "ref": ref,
+        "ref": generate_transaction_ref(type[:3].upper()),
         "dt": datetime.utcnow(),
         "referee": referee_id,
         "tier": tier,
         "note": note,
-    })
+    }
+
+
+class UnitOfWork:
+    """
+    Buffers transaction rows and ledger entries for one request and writes
+    them in a single DB transaction with one commit.
+
+    Ledger entries are posted together, so every credited user row is
+    locked once, in user-id order, and concurrent units of work lock rows
+    in the same sequence. Credits to hot accounts are deferred to
+    ``pending_credits`` instead (see hot_account_service). user_stats
+    counters for the credits and any recorded signups follow in one
+    statement, then the daily rollups in another.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._transactions: List[dict] = []
+        self._ledger_entries: List[dict] = []
+        self._signups: List[tuple] = []
+        self._rollups: List[dict] = []
+
+    def add_transaction(self, row: dict) -> str:
+        self._transactions.append(row)
+        self._rollups.append(rollup_service.transaction_event(row))
+        return row["id"]
+
+    def credit(self, user_id: str, amount, entry_type: str, transaction_id: Optional[str] = None) -> None:
+        self._ledger_entries.append(ledger_entry(user_id, entry_type, amount, transaction_id=transaction_id))
+
+    def record_signup(self, user_id: str, ancestor_ids: List[str]) -> None:
+        self._signups.append((user_id, ancestor_ids))
+        self._rollups.append(rollup_service.rollup_event(rollup_service.SIGNUP))
+
+    async def flush(self) -> None:
+        direct: List[dict] = []
+        if self._ledger_entries:
+            direct, deferred = await hot_accounts.split(self.db, self._ledger_entries)
+            await hot_accounts.defer(self.db, deferred)
+            await post_entries(self.db, direct, update_stats=False)
+        if self._transactions:
+            await self._insert_transactions()
+        await self._update_stats(direct)
+        await rollup_service.record(self.db, self._rollups)
+
+        self._ledger_entries = []
+        self._transactions = []
+        self._signups = []
+        self._rollups = []
+
+    async def _update_stats(self, posted: List[dict]) -> None:
+        # All counter changes of this unit in one id-ordered statement,
+        # after the ledger has taken its users row locks
+        deltas = stats_deltas(posted)
+        for user_id, ancestor_ids in self._signups:
+            await user_stats_service.create_stats_row(self.db, user_id)
+            for column, values in user_stats_service.signup_deltas(ancestor_ids).items():
+                merged = deltas.setdefault(column, {})
+                for uid, amount in values.items():
+                    merged[uid] = merged.get(uid, 0) + amount
+        await user_stats_service.apply_deltas(self.db, **deltas)
+
+    async def _insert_transactions(self) -> None:
+        # Single multi-row INSERT instead of one statement per row
+        params = {}
+        values = []
+        for i, row in enumerate(self._transactions):
+            params.update({f"{key}_{i}": value for key, value in row.items()})
+            values.append(
+                f"(:id_{i}, :uid_{i}, :type_{i}, :amt_{i}, :cur_{i}, :status_{i}, :ref_{i}, :dt_{i}, "
+                f":referee_{i}, :tier_{i}, :note_{i})"
+            )
+
+        await self.db.execute(
+            text(f"""
+                INSERT INTO transactions (
+                    id, user_id, type, amount, currency, status, reference, created_at,
+                    referee_id, tier, note
+                )
+                VALUES {", ".join(values)}
+            """),
+            params,
+        )
+
+    async def commit(self) -> None:
+        await self.flush()
+        await self.db.commit()
+
+
+async def log_transaction(
+    db: AsyncSession,
+    *,
+    user_id: str,
+    type: str,
+    amount: str,
+    currency: str = "usd",
+    status: str = "completed",
+    referee_id: Optional[str] = None,
+    tier: Optional[int] = None,
+    note: Optional[str] = None,
+    commit: bool = True,
+    uow: Optional[UnitOfWork] = None,
+) -> str:
+    """Insert a transaction into the DB (or buffer it in ``uow``) and return its ID"""
+    row = build_transaction_row(
+        user_id=user_id,
+        type=type,
+        amount=amount,
+        currency=currency,
+        status=status,
+        referee_id=referee_id,
+        tier=tier,
+        note=note,
+    )
+
+    if uow is not None:
+        return uow.add_transaction(row)
+
+    await db.execute(INSERT_TRANSACTION, row)
+    await rollup_service.record(db, [rollup_service.transaction_event(row)])
 
     if commit:
         await db.commit()
 
-    return tid
+    return row["id"]
 
 
 # -----------------------------
@@ -161,7 +279,9 @@ async def log_withdrawal(user_id: str, amount: str, currency: str = "usd", db: A
 # -----------------------------
 # LOG REFERRAL BONUS
 # -----------------------------
-async def log_referral_bonus(user_id: str, referee_id: str, amount: str, tier: int, db: AsyncSession = None):
+async def log_referral_bonus(
+    user_id: str, referee_id: str, amount: str, tier: int, db: AsyncSession = None, uow: Optional[UnitOfWork] = None
+):
     return await log_transaction(
         db,
         user_id=user_id,
@@ -169,70 +289,85 @@ async def log_referral_bonus(user_id: str, referee_id: str, amount: str, tier: i
         amount=amount,
         referee_id=referee_id,
         tier=tier,
+        uow=uow,
     )
 
 
 # -----------------------------
 # LOG ADMIN CREDIT (MASTERKEY leftover)
 # -----------------------------
-async def log_admin_credit(user_id: str, amount: str, note: str, db: AsyncSession = None):
+async def log_admin_credit(
+    user_id: str, amount: str, note: str, db: AsyncSession = None, uow: Optional[UnitOfWork] = None
+):
     return await log_transaction(
         db,
         user_id=user_id,
         type="admin_credit",
         amount=amount,
         note=note,
+        uow=uow,
     )
 
 
 # -----------------------------
 # DISTRIBUTE SIGNUP BONUS (6 tiers + MASTERKEY fallback)
 # -----------------------------
-async def distribute_signup_bonus(new_user_id: str, referrer_code: Optional[str], signup_fee: float, db: AsyncSession):
+async def distribute_signup_bonus(
+    new_user_id: str,
+    referrer_code: Optional[str],
+    signup_fee: float,
+    db: AsyncSession,
+    uow: Optional[UnitOfWork] = None,
+):
+    """
+    Credits up to six tiers of referrers plus the MASTERKEY leftover.
+
+    With ``uow`` the credits are only buffered and the caller commits them
+    together with the rest of its work; otherwise they are committed here.
+    """
     if not referrer_code:
         return
 
-    master_key = settings.MASTER_REFERRAL_CODE
-    percentages = [0.10, 0.085, 0.07225, 0.0614, 0.0522, 0.044]
+    owns_uow = uow is None
+    if owns_uow:
+        uow = UnitOfWork(db)
+
+    percentages = SIGNUP_BONUS_PERCENTAGES
+
+    # Whole upline (tier 1..6) from the referral closure, plus the MASTERKEY
+    # account, in one round trip. Tier 1 is the referrer itself (depth 0).
+    upline_query = text("""
+        SELECT c.ancestor_id AS id, c.depth + 1 AS tier
+        FROM users r
+        JOIN referral_closure c ON c.descendant_id = r.id
+        WHERE r.referral_code = :code AND c.depth < :max_tier
+        UNION ALL
+        SELECT id, 0 AS tier FROM users WHERE referral_code = :master_code
+        ORDER BY tier
+    """)
+    result = await db.execute(upline_query, {
+        "code": referrer_code,
+        "max_tier": len(percentages),
+        "master_code": settings.MASTER_REFERRAL_CODE,
+    })
+    rows = result.fetchall()
+    master = next((r for r in rows if r.tier == 0), None)
+    upline = [r for r in rows if r.tier > 0]
 
     total_distributed = 0.0
-    current_code = referrer_code
-
-    for tier, pct in enumerate(percentages, start=1):
-        query = text("SELECT id, referred_by_code FROM users WHERE referral_code = :code LIMIT 1")
-        result = await db.execute(query, {"code": current_code})
-        referrer = result.fetchone()
-        if not referrer:
-            break
-
-        bonus_amount = round(signup_fee * pct, 2)
+    for referrer in upline:
+        bonus_amount = round(signup_fee * percentages[referrer.tier - 1], 2)
         total_distributed += bonus_amount
 
-        # Update referrer balance
-        await db.execute(
-            text("UPDATE users SET balance = balance + :amt WHERE id = :uid"),
-            {"amt": bonus_amount, "uid": referrer.id},
-        )
-
-        # Log bonus
-        await log_referral_bonus(referrer.id, new_user_id, str(bonus_amount), tier, db)
-
-        # Move up chain
-        current_code = referrer.referred_by_code
+        # Log bonus + credit referrer (buffered)
+        tid = await log_referral_bonus(referrer.id, new_user_id, str(bonus_amount), referrer.tier, db, uow=uow)
+        uow.credit(referrer.id, bonus_amount, "referral_bonus", tid)
 
     # Leftover → MASTERKEY
     leftover = round(signup_fee - total_distributed, 2)
-    if leftover > 0:
-        result = await db.execute(
-            text("SELECT id FROM users WHERE referral_code = :code LIMIT 1"),
-            {"code": master_key},
-        )
-        master = result.fetchone()
-        if master:
-            await db.execute(
-                text("UPDATE users SET balance = balance + :amt WHERE id = :uid"),
-                {"amt": leftover, "uid": master.id},
-            )
-            await log_admin_credit(master.id, str(leftover), f"Leftover from signup of {new_user_id}", db)
+    if leftover > 0 and master:
+        tid = await log_admin_credit(master.id, str(leftover), f"Leftover from signup of {new_user_id}", db, uow=uow)
+        uow.credit(master.id, leftover, "admin_credit", tid)
 
-    await db.commit()
+    if owns_uow:
+        await uow.commit()
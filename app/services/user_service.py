@@ -3,6 +3,7 @@ from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from datetime import datetime
+from decimal import Decimal
 from uuid import uuid4
 
 from app.schemas.user_schemas import (
@@ -11,33 +12,49 @@ from app.schemas.user_schemas import (
     WithdrawalRequest, WithdrawalResponse, TransactionResponse
 )
 from app.utils.security import (
-    hash_password, verify_password,
-    hash_pin, verify_pin as verify_pin_util  # 👈 renamed to avoid collision
+    hash_password_async, verify_password_async,
+    hash_pin_async, verify_pin_async
 )
+from app.services.ledger_service import post_entry
+from app.services import rollup_service
+from app.utils.common import from_minor_units
 
 
 # -----------------------------
 # PROFILE
 # -----------------------------
 async def get_profile(user: dict, db: AsyncSession):
+    # Balance comes from the latest ledger entry plus unfolded hot-account credits
     query = text("""
         SELECT 
-            id,
-            email,
-            username,
-            first_name,
-            last_name,
-            referral_code,
-            referred_by_code,
-            is_kyc_verified,
-            balance,
-            role,
-            status,
-            withdrawal_status,
-            is_2fa_enabled,
-            withdrawal_pin_hash
-        FROM users 
-        WHERE id = :id
+            u.id,
+            u.email,
+            u.username,
+            u.first_name,
+            u.last_name,
+            u.referral_code,
+            u.referred_by_code,
+            u.is_kyc_verified,
+            COALESCE(le.balance_after_minor, 0) + pc.amount_minor AS balance_minor,
+            u.role,
+            u.status,
+            u.withdrawal_status,
+            u.is_2fa_enabled,
+            u.withdrawal_pin_hash
+        FROM users u
+        LEFT JOIN LATERAL (
+            SELECT balance_after_minor
+            FROM ledger_entries
+            WHERE user_id = u.id
+            ORDER BY id DESC
+            LIMIT 1
+        ) le ON true
+        CROSS JOIN LATERAL (
+            SELECT COALESCE(SUM(amount_minor), 0) AS amount_minor
+            FROM pending_credits
+            WHERE user_id = u.id
+        ) pc
+        WHERE u.id = :id
         LIMIT 1
     """)
     result = await db.execute(query, {"id": user["id"]})
@@ -54,7 +71,7 @@ async def get_profile(user: dict, db: AsyncSession):
         referral_code=record.referral_code,
         referred_by_code=record.referred_by_code,
         is_kyc_verified=record.is_kyc_verified,
-        balance=str(record.balance),
+        balance=str(from_minor_units(record.balance_minor)),
         has_pin=bool(record.withdrawal_pin_hash),  # 👈 derive from DB
         is2fa_enabled=record.is_2fa_enabled,
         role=record.role,
@@ -84,10 +101,10 @@ async def change_password(user: dict, payload: ChangePasswordRequest, db: AsyncS
     if not record:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if not verify_password(payload.old_password, record.password_hash):
+    if not await verify_password_async(payload.old_password, record.password_hash):
         raise HTTPException(status_code=400, detail="Old password is incorrect")
 
-    new_hash = hash_password(payload.new_password)
+    new_hash = await hash_password_async(payload.new_password)
     update_q = text("UPDATE users SET password_hash = :ph WHERE id = :id")
     await db.execute(update_q, {"id": user["id"], "ph": new_hash})
     await db.commit()
@@ -98,7 +115,7 @@ async def change_password(user: dict, payload: ChangePasswordRequest, db: AsyncS
 # PIN
 # -----------------------------
 async def set_pin(user: dict, payload: SetPinRequest, db: AsyncSession):
-    pin_hash = hash_pin(payload.pin)
+    pin_hash = await hash_pin_async(payload.pin)
     query = text("UPDATE users SET withdrawal_pin_hash = :ph, has_pin = true WHERE id = :id")
     await db.execute(query, {"id": user["id"], "ph": pin_hash})
     await db.commit()
@@ -109,10 +126,10 @@ async def change_pin(user: dict, payload: ChangePinRequest, db: AsyncSession):
     query = text("SELECT password_hash FROM users WHERE id = :id")
     result = await db.execute(query, {"id": user["id"]})
     record = result.fetchone()
-    if not record or not verify_password(payload.current_password, record.password_hash):
+    if not record or not await verify_password_async(payload.current_password, record.password_hash):
         raise HTTPException(status_code=400, detail="Invalid current password")
 
-    new_pin_hash = hash_pin(payload.new_pin)
+    new_pin_hash = await hash_pin_async(payload.new_pin)
     update_q = text("UPDATE users SET withdrawal_pin_hash = :ph WHERE id = :id")
     await db.execute(update_q, {"id": user["id"], "ph": new_pin_hash})
     await db.commit()
@@ -126,7 +143,7 @@ async def verify_user_pin(user: dict, payload: VerifyPinRequest, db: AsyncSessio
     if not record or not record.withdrawal_pin_hash:
         raise HTTPException(status_code=400, detail="PIN not set")
 
-    if not verify_pin_util(payload.pin, record.withdrawal_pin_hash):
+    if not await verify_pin_async(payload.pin, record.withdrawal_pin_hash):
         raise HTTPException(status_code=400, detail="Incorrect PIN")
 
     return {"message": "PIN verified successfully"}
@@ -136,11 +153,8 @@ async def verify_user_pin(user: dict, payload: VerifyPinRequest, db: AsyncSessio
 # WITHDRAWALS
 # -----------------------------
 async def request_withdrawal(user: dict, payload: WithdrawalRequest, db: AsyncSession):
-    # Check balance
-    res = await db.execute(text("SELECT balance FROM users WHERE id = :id"), {"id": user["id"]})
-    balance = res.scalar()
-    if balance is None or balance < float(payload.amount):
-        raise HTTPException(status_code=400, detail="Insufficient balance")
+    if float(payload.amount) <= 0:
+        raise HTTPException(status_code=400, detail="Withdrawal amount must be positive")
 
     wid = str(uuid4())
     await db.execute(
@@ -151,10 +165,10 @@ async def request_withdrawal(user: dict, payload: WithdrawalRequest, db: AsyncSe
         {"id": wid, "uid": user["id"], "amt": payload.amount, "cur": payload.currency, "dt": datetime.utcnow()},
     )
 
-    # Deduct immediately (locked funds)
-    await db.execute(
-        text("UPDATE users SET balance = balance - :amt WHERE id = :uid"),
-        {"amt": payload.amount, "uid": user["id"]},
+    # Hold the funds immediately (rejects overdrafts under the row lock)
+    await post_entry(db, user["id"], "withdrawal_hold", -Decimal(str(payload.amount)), withdrawal_id=wid)
+    await rollup_service.record(
+        db, [rollup_service.rollup_event(rollup_service.WITHDRAWAL_REQUEST, payload.currency, payload.amount)]
     )
 
     await db.commit()
@@ -0,0 +1,180 @@
+# app/services/user_stats_service.py
+import random
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+# user_stats holds one row of money counters per user, kept current by the
+# code paths that change them, always in the same transaction as the change.
+# Each transaction updates its rows in one user-id-ordered statement, after
+# any users row locks taken by the ledger, so concurrent writers can't
+# deadlock.
+#
+# Team counters change on every signup for every ancestor, up to the root,
+# so they live in user_team_counts instead: TEAM_COUNT_SHARDS rows per user,
+# a signup adds to one random shard of each ancestor (again in user-id
+# order, after user_stats), readers sum the shards. Signups under the same
+# top-of-tree account then rarely wait on each other.
+
+
+# -----------------------------
+# SIGNUP
+# -----------------------------
+def signup_deltas(ancestor_ids: List[str]) -> dict:
+    """
+    Counter deltas for a new user's upline (``ancestor_ids`` nearest first,
+    as returned by ``add_user_to_closure``): +1 team size for every
+    ancestor and +1 direct referral for the nearest.
+    """
+    if not ancestor_ids:
+        return {}
+    return {
+        "team_size": {str(a): 1 for a in ancestor_ids},
+        "direct_referrals": {str(ancestor_ids[0]): 1},
+    }
+
+
+async def create_stats_row(db: AsyncSession, user_id: str) -> None:
+    await db.execute(
+        text("INSERT INTO user_stats (user_id) VALUES (:uid) ON CONFLICT (user_id) DO NOTHING"),
+        {"uid": user_id},
+    )
+
+
+async def record_signup(db: AsyncSession, user_id: str, ancestor_ids: List[str]) -> None:
+    """Counters for a new user that earns nobody a bonus (e.g. created by an admin)."""
+    await create_stats_row(db, user_id)
+    await apply_deltas(db, **signup_deltas(ancestor_ids))
+
+
+# -----------------------------
+# DELTAS
+# -----------------------------
+def _merge(target: Dict[str, Dict[str, int]], column: str, deltas: Optional[Dict[str, int]]):
+    for uid, amount in (deltas or {}).items():
+        if amount:
+            row = target.setdefault(str(uid), {})
+            row[column] = row.get(column, 0) + amount
+
+
+async def apply_deltas(
+    db: AsyncSession,
+    earnings: Optional[Dict[str, int]] = None,
+    pending_withdrawals: Optional[Dict[str, int]] = None,
+    team_size: Optional[Dict[str, int]] = None,
+    direct_referrals: Optional[Dict[str, int]] = None,
+) -> None:
+    """
+    Add counter deltas per user (money in minor units): one statement for
+    user_stats, one for the team counter shards. A transaction should call
+    this once, after its ledger postings, so the rows it touches are locked
+    in a single id-ordered pass per table.
+    """
+    await _apply_money_deltas(db, earnings, pending_withdrawals)
+    await _apply_team_deltas(db, team_size, direct_referrals)
+
+
+async def _apply_money_deltas(
+    db: AsyncSession, earnings: Optional[Dict[str, int]], pending_withdrawals: Optional[Dict[str, int]]
+) -> None:
+    rows: Dict[str, Dict[str, int]] = {}
+    _merge(rows, "earn", earnings)
+    _merge(rows, "pend", pending_withdrawals)
+    if not rows:
+        return
+
+    params = {}
+    values = []
+    for i, uid in enumerate(sorted(rows)):
+        params[f"uid_{i}"] = uid
+        for column in ("earn", "pend"):
+            params[f"{column}_{i}"] = rows[uid].get(column, 0)
+        values.append(f"(CAST(:uid_{i} AS uuid), CAST(:earn_{i} AS bigint), CAST(:pend_{i} AS bigint))")
+
+    await db.execute(
+        text(f"""
+            WITH deltas (user_id, earn_minor, pending_minor) AS (VALUES {", ".join(values)}),
+            locked AS (
+                SELECT s.user_id FROM user_stats s
+                WHERE s.user_id IN (SELECT user_id FROM deltas)
+                ORDER BY s.user_id
+                FOR UPDATE
+            )
+            UPDATE user_stats s
+            SET lifetime_earnings_minor = s.lifetime_earnings_minor + d.earn_minor,
+                pending_withdrawals_minor = s.pending_withdrawals_minor + d.pending_minor,
+                updated_at = now()
+            FROM deltas d
+            WHERE s.user_id = d.user_id AND s.user_id IN (SELECT user_id FROM locked)
+        """),
+        params,
+    )
+
+
+async def _apply_team_deltas(
+    db: AsyncSession, team_size: Optional[Dict[str, int]], direct_referrals: Optional[Dict[str, int]]
+) -> None:
+    rows: Dict[str, Dict[str, int]] = {}
+    _merge(rows, "team", team_size)
+    _merge(rows, "direct", direct_referrals)
+    if not rows:
+        return
+
+    params = {"shard": random.randrange(max(settings.TEAM_COUNT_SHARDS, 1))}
+    values = []
+    for i, uid in enumerate(sorted(rows)):
+        params[f"uid_{i}"] = uid
+        for column in ("team", "direct"):
+            params[f"{column}_{i}"] = rows[uid].get(column, 0)
+        values.append(
+            f"(CAST(:uid_{i} AS uuid), CAST(:shard AS smallint), "
+            f"CAST(:direct_{i} AS integer), CAST(:team_{i} AS integer))"
+        )
+
+    await db.execute(
+        text(f"""
+            INSERT INTO user_team_counts (user_id, shard, direct_referrals, total_team_size)
+            VALUES {", ".join(values)}
+            ON CONFLICT (user_id, shard) DO UPDATE
+            SET direct_referrals = user_team_counts.direct_referrals + EXCLUDED.direct_referrals,
+                total_team_size = user_team_counts.total_team_size + EXCLUDED.total_team_size
+        """),
+        params,
+    )
+
+
+# -----------------------------
+# READ
+# -----------------------------
+async def get_user_stats(db: AsyncSession, user_id: str):
+    """
+    The user's counters (primary-key reads, team shards summed), or None.
+    Earnings include hot-account credits not folded yet: user_stats only
+    counts them once the folder moves them to the ledger, in the same
+    transaction that deletes them from pending_credits.
+    """
+    result = await db.execute(
+        text("""
+            SELECT COALESCE(t.direct_referrals, 0) AS direct_referrals,
+                   COALESCE(t.total_team_size, 0) AS total_team_size,
+                   s.lifetime_earnings_minor + COALESCE(p.earning_minor, 0) AS lifetime_earnings_minor,
+                   s.pending_withdrawals_minor
+            FROM user_stats s
+            LEFT JOIN LATERAL (
+                SELECT SUM(direct_referrals) AS direct_referrals, SUM(total_team_size) AS total_team_size
+                FROM user_team_counts
+                WHERE user_id = s.user_id
+            ) t ON true
+            LEFT JOIN LATERAL (
+                SELECT SUM(earning_minor) AS earning_minor
+                FROM pending_credits
+                WHERE user_id = s.user_id
+            ) p ON true
+            WHERE s.user_id = :uid
+        """),
+        {"uid": user_id},
+    )
+    return result.fetchone()
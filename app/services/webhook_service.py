@@ -7,9 +7,11 @@ import stripe
 import json
 import logging
 
-from app.utils.common import generate_referral_code
+from app.utils.common import generate_referral_code, SIGNUP_FEE
 from app.config import settings
-from app.services.transaction_service import distribute_signup_bonus
+from app.services.transaction_service import distribute_signup_bonus, UnitOfWork
+from app.services.referral_service import add_user_to_closure
+from app.services.team_service import invalidate_team_trees
 
 logger = logging.getLogger(__name__)
 stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -108,22 +110,31 @@ async def handle_stripe_webhook(request: Request, db: AsyncSession):
         await db.execute(insert_user, params)
         logger.info(f"📝 Inserted user with params: {params}")
 
-        # Distribute referral bonus
-        signup_fee = 50
+        # Place the user in the referral closure (same transaction)
+        ancestor_ids = await add_user_to_closure(db, user_id, pending._mapping["referred_by_code"])
+
+        # Distribute referral bonus (buffered, written with the user in one commit)
+        uow = UnitOfWork(db)
+        signup_fee = SIGNUP_FEE
         await distribute_signup_bonus(
             new_user_id=user_id,
             referrer_code=pending._mapping["referred_by_code"],  # 👈 fixed
             signup_fee=signup_fee,
-            db=db
+            db=db,
+            uow=uow,
         )
 
         # Delete pending registration
         delete_pending = text("DELETE FROM pending_registrations WHERE id = :id")
         await db.execute(delete_pending, {"id": pending_id})
 
-        await db.commit()
+        uow.record_signup(user_id, ancestor_ids)
+        await uow.commit()
         logger.info(f"🎉 User {user_id} created and pending_id={pending_id} removed")
 
+        # Only the new user's upline sees a different team tree
+        invalidate_team_trees(ancestor_ids)
+
     except Exception as e:
         logger.exception(f"❌ Failed to move pending {pending_id} to users: {e}")
         await db.rollback()
@@ -2,12 +2,15 @@ from fastapi import Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from datetime import datetime
+from decimal import Decimal
 from uuid import uuid4
 from typing import List
 
 from app.database import get_db
 from app.schemas.withdrawal_schemas import WithdrawalCreateRequest, WithdrawalResponse
 from app.utils.stripe_client import create_payout
+from app.services.ledger_service import post_entry
+from app.services import rollup_service
 
 
 # -----------------------------
@@ -35,9 +38,9 @@ async def list_withdrawals(user, db: AsyncSession = Depends(get_db)) -> List[Wit
 # CREATE WITHDRAWAL REQUEST
 # -----------------------------
 async def create_withdrawal(user, payload: WithdrawalCreateRequest, db: AsyncSession = Depends(get_db)) -> WithdrawalResponse:
-    # 1. Check balance
-    balance_q = text("SELECT balance, is_kyc_verified, has_pin FROM users WHERE id = :id")
-    result = await db.execute(balance_q, {"id": user["id"]})
+    # 1. Check eligibility
+    eligibility_q = text("SELECT is_kyc_verified, has_pin FROM users WHERE id = :id")
+    result = await db.execute(eligibility_q, {"id": user["id"]})
     record = result.fetchone()
 
     if not record:
@@ -49,15 +52,10 @@ async def create_withdrawal(user, payload: WithdrawalCreateRequest, db: AsyncSes
     if not record.has_pin:
         raise HTTPException(status_code=403, detail="Withdrawal PIN must be set")
 
-    if float(record.balance) < float(payload.amount):
-        raise HTTPException(status_code=400, detail="Insufficient balance")
+    if float(payload.amount) <= 0:
+        raise HTTPException(status_code=400, detail="Withdrawal amount must be positive")
 
-    # 2. Deduct balance immediately
-    new_balance = float(record.balance) - float(payload.amount)
-    update_balance_q = text("UPDATE users SET balance = :bal WHERE id = :id")
-    await db.execute(update_balance_q, {"id": user["id"], "bal": str(new_balance)})
-
-    # 3. Insert withdrawal request
+    # 2. Insert withdrawal request
     wid = str(uuid4())
     insert_q = text("""
         INSERT INTO withdrawals (id, user_id, amount, destination_address, status, requested_at)
@@ -70,6 +68,12 @@ async def create_withdrawal(user, payload: WithdrawalCreateRequest, db: AsyncSes
         "dest": payload.destination_address,
         "req": datetime.utcnow(),
     })
+
+    # 3. Hold the funds on the ledger (rejects overdrafts under the row lock)
+    await post_entry(db, user["id"], "withdrawal_hold", -Decimal(str(payload.amount)), withdrawal_id=wid)
+    await rollup_service.record(
+        db, [rollup_service.rollup_event(rollup_service.WITHDRAWAL_REQUEST, None, payload.amount)]
+    )
     await db.commit()
 
     return WithdrawalResponse(
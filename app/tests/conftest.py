@@ -0,0 +1,7 @@
+import pytest
+
+
+# Async tests run with anyio's pytest plugin, on asyncio only
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
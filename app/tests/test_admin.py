@@ -0,0 +1,104 @@
+# Admin tests
+import asyncio
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+
+from app.services.admin_service import _csv_cell
+from app.services.admin_stats_service import AdminStatsSnapshot
+
+
+# -----------------------------
+# EXPORTS
+# -----------------------------
+@pytest.mark.parametrize("value", ["=SUM(A1:A9)", "+1", "-1", "@cmd", "\tx", "\rx"])
+def test_csv_cell_escapes_formulas(value):
+    assert _csv_cell(value) == "'" + value
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("alice", "alice"),
+    ("", ""),
+    (None, ""),
+    (Decimal("-5.00"), "-5.00"),
+    (7, 7),
+    (True, True),
+    (datetime(2026, 10, 18, tzinfo=timezone.utc), "2026-10-18T00:00:00+00:00"),
+    (UUID("00000000-0000-0000-0000-000000000001"), "00000000-0000-0000-0000-000000000001"),
+])
+def test_csv_cell_keeps_other_values(value, expected):
+    assert _csv_cell(value) == expected
+
+
+# -----------------------------
+# STATS SNAPSHOT
+# -----------------------------
+class FakeSnapshot(AdminStatsSnapshot):
+    """Stored row and recompute simulated in memory."""
+
+    def __init__(self, stored_age=None, refreshed_elsewhere=False):
+        super().__init__(refresh_interval=30, max_age=120)
+        self.stored_age = stored_age
+        self.refreshed_elsewhere = refreshed_elsewhere
+        self.calls = []
+
+    async def load(self, primary=False):
+        self.calls.append(("load", primary))
+        await asyncio.sleep(0)
+        if self.stored_age is None:
+            return None
+        self._use({"source": "stored"})
+        return self.stored_age
+
+    async def refresh(self, min_age=0.0, wait=False):
+        self.calls.append(("refresh", min_age, wait))
+        await asyncio.sleep(0)
+        if self.refreshed_elsewhere:
+            self.stored_age = 0
+            return None
+        return self._use({"source": "computed"})
+
+
+@pytest.mark.anyio
+async def test_get_serves_the_stored_snapshot():
+    snapshot = FakeSnapshot(stored_age=10)
+    assert await snapshot.get() == {"source": "stored"}
+    assert await snapshot.get() == {"source": "stored"}  # local copy, not re-read
+    assert snapshot.calls == [("load", False)]
+    assert snapshot.inline_refreshes == 0
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("stored_age", [None, 121])
+async def test_get_refreshes_inline_when_missing_or_too_old(stored_age):
+    snapshot = FakeSnapshot(stored_age=stored_age)
+    assert await snapshot.get() == {"source": "computed"}
+    assert snapshot.calls == [("load", False), ("refresh", 120, True)]
+    assert snapshot.inline_refreshes == 1
+
+
+@pytest.mark.anyio
+async def test_get_rereads_from_primary_when_another_worker_refreshed():
+    snapshot = FakeSnapshot(stored_age=None, refreshed_elsewhere=True)
+    assert await snapshot.get() == {"source": "stored"}
+    assert snapshot.calls == [("load", False), ("refresh", 120, True), ("load", True)]
+
+
+@pytest.mark.anyio
+async def test_get_reloads_after_refresh_interval():
+    snapshot = FakeSnapshot(stored_age=10)
+    await snapshot.get()
+    snapshot._loaded_at -= 31
+    await snapshot.get()
+    assert snapshot.calls == [("load", False), ("load", False)]
+
+
+@pytest.mark.anyio
+async def test_concurrent_gets_share_one_inline_refresh():
+    snapshot = FakeSnapshot(stored_age=None)
+    results = await asyncio.gather(*(snapshot.get() for _ in range(10)))
+    assert results == [{"source": "computed"}] * 10
+    assert snapshot.calls == [("load", False), ("refresh", 120, True)]
+    assert snapshot.inline_refreshes == 1
@@ -0,0 +1,30 @@
+# Bloom filter tests
+import pytest
+
+from app.utils.bloom import BloomFilter
+
+
+def test_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"jti-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert bloom.count == 1000
+
+
+@pytest.mark.parametrize("error_rate", [0.01, 0.001])
+def test_false_positive_rate_at_capacity(error_rate):
+    bloom = BloomFilter(capacity=10_000, error_rate=error_rate)
+    for i in range(10_000):
+        bloom.add(f"revoked-{i}")
+
+    probes = 100_000
+    false_positives = sum(bloom.might_contain(f"never-added-{i}") for i in range(probes))
+    assert false_positives / probes <= 2 * error_rate
+
+
+@pytest.mark.parametrize("capacity, error_rate", [(0, 0.01), (100, 0), (100, 1)])
+def test_rejects_bad_parameters(capacity, error_rate):
+    with pytest.raises(ValueError):
+        BloomFilter(capacity, error_rate)
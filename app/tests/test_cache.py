@@ -0,0 +1,67 @@
+# Cache tests
+import time
+
+from app.utils.cache import SizedLRUCache
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = SizedLRUCache(max_bytes=100, max_entry_bytes=100)
+    cache.set("a", "A", 40)
+    cache.set("b", "B", 40)
+    assert cache.get("a") == "A"  # b is now the least recently used
+
+    cache.set("c", "C", 40)
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    assert cache.bytes == 80
+    assert cache.evictions == 1
+
+
+def test_oversized_entries_are_not_cached():
+    cache = SizedLRUCache(max_bytes=100, max_entry_bytes=10)
+    cache.set("big", "X", 11)
+    assert cache.get("big") is None
+    assert cache.oversized == 1
+    assert cache.bytes == 0
+
+
+def test_invalidate_tag_drops_tagged_entries():
+    cache = SizedLRUCache(max_bytes=100)
+    cache.set("a", "A", 1, tags=("team:1",))
+    cache.set("b", "B", 1, tags=("team:1", "team:2"))
+    cache.set("c", "C", 1, tags=("team:2",))
+
+    assert cache.invalidate_tag("team:1") == 2
+    assert len(cache) == 1
+    assert cache.get("c") == "C"
+    assert cache.bytes == 1
+
+
+def test_value_read_before_invalidation_is_not_stored():
+    cache = SizedLRUCache(max_bytes=100)
+    read_at = time.monotonic()
+    cache.invalidate_tag("team:1")  # lands while the value is in flight
+
+    cache.set("a", "stale", 1, tags=("team:1",), read_at=read_at)
+    assert cache.get("a") is None
+    assert cache.stale_fills == 1
+
+
+def test_value_read_after_invalidation_is_stored():
+    cache = SizedLRUCache(max_bytes=100)
+    cache.invalidate_tag("team:1")
+    read_at = time.monotonic()
+
+    cache.set("a", "fresh", 1, tags=("team:1",), read_at=read_at)
+    cache.set("b", "other", 1, tags=("team:2",), read_at=read_at - 1)
+    assert cache.get("a") == "fresh"
+    assert cache.get("b") == "other"
+    assert cache.stale_fills == 0
+
+
+def test_value_read_longer_ago_than_ttl_is_not_stored():
+    cache = SizedLRUCache(max_bytes=100, ttl=60)
+    cache.set("a", "old", 1, tags=("team:1",), read_at=time.monotonic() - 61)
+    assert cache.get("a") is None
+    assert cache.stale_fills == 1
@@ -0,0 +1,125 @@
+# Ledger tests
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.ledger_service import ledger_entry, post_entries, stats_deltas
+
+pytestmark = pytest.mark.anyio
+
+ALICE = str(uuid4())
+BOB = str(uuid4())
+
+
+class FakeResult:
+    def __init__(self, rows=()):
+        self._rows = list(rows)
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+class FakeSession:
+    """Answers the ledger's statements with canned rows, by the table they read."""
+
+    def __init__(self, appended, pending=()):
+        self.appended = appended
+        self.pending = pending
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if "INSERT INTO ledger_entries" in sql:
+            return FakeResult(self.appended)
+        if "FROM pending_credits" in sql:
+            return FakeResult(self.pending)
+        return FakeResult()
+
+    def read_pending(self) -> bool:
+        return any("FROM pending_credits" in sql for sql in self.statements)
+
+
+def appended(id, user_id, amount_minor, balance_after_minor):
+    return SimpleNamespace(id=id, user_id=user_id, amount_minor=amount_minor, balance_after_minor=balance_after_minor)
+
+
+# -----------------------------
+# ENTRIES
+# -----------------------------
+def test_ledger_entry_converts_to_minor_units():
+    entry = ledger_entry(ALICE, "referral_bonus", "12.345")
+    assert entry["amount_minor"] == 1235
+    assert entry["earning_minor"] == 1235
+
+    hold = ledger_entry(ALICE, "withdrawal_hold", -5)
+    assert hold["amount_minor"] == -500
+    assert hold["earning_minor"] == 0
+
+
+def test_stats_deltas():
+    entries = [
+        ledger_entry(ALICE, "referral_bonus", 10),
+        ledger_entry(ALICE, "admin_credit", 2),
+        ledger_entry(ALICE, "withdrawal_hold", -7),
+        ledger_entry(BOB, "withdrawal_release", 3),
+    ]
+    assert stats_deltas(entries) == {
+        "earnings": {ALICE: 1200, BOB: 0},
+        "pending_withdrawals": {ALICE: 700, BOB: -300},
+    }
+
+
+# -----------------------------
+# POSTING
+# -----------------------------
+async def test_post_entries_returns_latest_running_balance_per_user():
+    db = FakeSession([
+        appended(3, ALICE, 200, 1700),
+        appended(1, ALICE, 500, 1500),
+        appended(2, BOB, 100, 100),
+    ])
+    entries = [
+        ledger_entry(ALICE, "referral_bonus", 5),
+        ledger_entry(BOB, "referral_bonus", 1),
+        ledger_entry(ALICE, "referral_bonus", 2),
+    ]
+    assert await post_entries(db, entries, update_stats=False) == {ALICE: 1700, BOB: 100}
+    assert not db.read_pending()
+
+
+async def test_post_entries_rejects_overdraft():
+    db = FakeSession([appended(1, ALICE, -500, -200)])
+    with pytest.raises(HTTPException) as exc:
+        await post_entries(db, [ledger_entry(ALICE, "withdrawal_hold", -5)], update_stats=False)
+    assert exc.value.status_code == 400
+
+
+async def test_post_entries_counts_pending_credits_towards_debits():
+    db = FakeSession([appended(1, ALICE, -500, -200)], pending=[SimpleNamespace(user_id=ALICE, amount_minor=200)])
+    assert await post_entries(db, [ledger_entry(ALICE, "withdrawal_hold", -5)], update_stats=False) == {ALICE: -200}
+
+
+async def test_post_entries_rejects_overdraft_beyond_pending_credits():
+    # Checked against the lowest balance any of the user's debits leaves
+    db = FakeSession(
+        [appended(1, ALICE, -500, -200), appended(2, ALICE, 100, -100)],
+        pending=[SimpleNamespace(user_id=ALICE, amount_minor=150)],
+    )
+    entries = [ledger_entry(ALICE, "withdrawal_hold", -5), ledger_entry(ALICE, "withdrawal_release", 1)]
+    with pytest.raises(HTTPException):
+        await post_entries(db, entries, update_stats=False)
+
+
+async def test_post_entries_allows_credits_to_negative_balances():
+    db = FakeSession([appended(1, ALICE, 100, -50)])
+    assert await post_entries(db, [ledger_entry(ALICE, "withdrawal_release", 1)], update_stats=False) == {ALICE: -50}
+    assert not db.read_pending()
+
+
+async def test_post_entries_without_entries_does_nothing():
+    db = FakeSession([])
+    assert await post_entries(db, []) == {}
+    assert db.statements == []
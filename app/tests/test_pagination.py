@@ -0,0 +1,57 @@
+# Pagination tests
+import base64
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.pagination import decode_cursor, decode_keyset_cursor, encode_cursor, keyset_page
+
+
+def rows(n):
+    start = datetime(2026, 10, 18, tzinfo=timezone.utc).timestamp()
+    return [
+        SimpleNamespace(id=uuid4(), created_at=datetime.fromtimestamp(start - i, tz=timezone.utc))
+        for i in range(n)
+    ]
+
+
+def test_cursor_round_trip():
+    position = {"at": "2026-10-18T00:00:00+00:00", "id": str(uuid4())}
+    cursor = encode_cursor(position)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == position
+
+
+def test_no_cursor():
+    assert decode_cursor(None) == {}
+    assert decode_keyset_cursor(None) is None
+    assert decode_keyset_cursor("") is None
+
+
+def test_keyset_page_last_page_has_no_cursor():
+    page = rows(3)
+    assert keyset_page(page, 3, "created_at") == (page, None)
+
+
+def test_keyset_page_cursor_points_after_last_row():
+    fetched = rows(4)
+    page, cursor = keyset_page(fetched, 3, "created_at")
+    assert page == fetched[:3]
+    assert decode_keyset_cursor(cursor) == (fetched[2].created_at, str(fetched[2].id))
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+    base64.urlsafe_b64encode(b"[1, 2]").decode(),
+    encode_cursor({"id": str(uuid4())}),
+    encode_cursor({"at": "yesterday", "id": str(uuid4())}),
+    encode_cursor({"at": "2026-10-18T00:00:00+00:00", "id": "not-a-uuid"}),
+])
+def test_bad_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_keyset_cursor(cursor)
+    assert exc.value.status_code == 400
@@ -0,0 +1,13 @@
+# User stats tests
+from app.services.user_stats_service import signup_deltas
+
+
+def test_signup_deltas_without_upline():
+    assert signup_deltas([]) == {}
+
+
+def test_signup_deltas_counts_every_ancestor_and_the_nearest_as_direct():
+    assert signup_deltas(["parent", "grandparent", "root"]) == {
+        "team_size": {"parent": 1, "grandparent": 1, "root": 1},
+        "direct_referrals": {"parent": 1},
+    }
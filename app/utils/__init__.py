@@ -1,4 +1,7 @@
-from .security import hash_password, verify_password, hash_pin, verify_pin
+from .security import (
+    hash_password, verify_password, hash_pin, verify_pin,
+    hash_password_async, verify_password_async, hash_pin_async, verify_pin_async,
+)
 from .jwt_handler import create_access_token, create_refresh_token
 from .stripe_client import create_payment_intent, create_payout
 from .common import generate_referral_code, generate_transaction_ref
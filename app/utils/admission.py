@@ -0,0 +1,136 @@
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, capacity: float):
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+
+class TokenBucketLimiter:
+    """
+    Per-key token buckets (``rate`` tokens per second, up to ``burst``).
+    Only the ``max_keys`` most recently seen keys are tracked.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def try_acquire(self, key: str) -> float:
+        """Take one token. Returns 0 on success, otherwise seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.burst)
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+
+        now = time.monotonic()
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated_at) * self.rate)
+        bucket.updated_at = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Fail-fast gate in front of expensive (bcrypt) endpoints.
+
+    - At most ``max_concurrent`` requests are inside at once, anything else
+      gets a 503 straight away instead of queueing more hash work.
+    - Per-email and per-IP token buckets turn floods into 429s.
+    Both responses carry ``Retry-After``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: Optional[int] = None,
+        email_rate_per_minute: float = 10,
+        email_burst: float = 10,
+        ip_rate_per_minute: float = 60,
+        ip_burst: float = 30,
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent or (os.cpu_count() or 1) * 2
+        self.email_limiter = TokenBucketLimiter(email_rate_per_minute / 60, email_burst)
+        self.ip_limiter = TokenBucketLimiter(ip_rate_per_minute / 60, ip_burst)
+        self._in_flight = 0
+
+        # Metrics
+        self.admitted = 0
+        self.rejected_saturated = 0
+        self.rejected_email = 0
+        self.rejected_ip = 0
+
+    @asynccontextmanager
+    async def admit(self, email: Optional[str] = None, ip: Optional[str] = None):
+        if self._in_flight >= self.max_concurrent:
+            self.rejected_saturated += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        if ip:
+            retry_after = self.ip_limiter.try_acquire(ip)
+            if retry_after:
+                self.rejected_ip += 1
+                raise self._too_many(retry_after)
+
+        if email:
+            retry_after = self.email_limiter.try_acquire(email.lower())
+            if retry_after:
+                self.rejected_email += 1
+                raise self._too_many(retry_after)
+
+        self._in_flight += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+
+    @staticmethod
+    def _too_many(retry_after: float) -> HTTPException:
+        return HTTPException(
+            status_code=429,
+            detail="Too many attempts, please slow down",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self._in_flight,
+            "admitted": self.admitted,
+            "rejected_saturated": self.rejected_saturated,
+            "rejected_email": self.rejected_email,
+            "rejected_ip": self.rejected_ip,
+        }
+
+
+def client_ip(request: Request) -> Optional[str]:
+    # Run uvicorn with --proxy-headers behind a load balancer so this is the real client
+    return request.client.host if request.client else None
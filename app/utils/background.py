@@ -0,0 +1,22 @@
+import asyncio
+import logging
+from typing import Coroutine
+
+logger = logging.getLogger(__name__)
+
+# Strong references so fire-and-forget tasks aren't garbage collected mid-flight
+_tasks: set[asyncio.Task] = set()
+
+
+def spawn(coro: Coroutine) -> asyncio.Task:
+    """Run a coroutine in the background; failures are logged, never raised."""
+    task = asyncio.get_running_loop().create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+
+def _on_done(task: asyncio.Task):
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"❌ Background task failed: {task.exception()!r}")
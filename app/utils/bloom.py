@@ -0,0 +1,51 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    ``might_contain`` never returns a false negative; false positives happen
+    at roughly ``error_rate`` while fewer than ``capacity`` items were added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("Bloom filter needs capacity > 0 and 0 < error_rate < 1")
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        # Double hashing (Kirsch-Mitzenmacher) off a single 128-bit digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def might_contain(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def __contains__(self, item: str) -> bool:
+        return self.might_contain(item)
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "count": self.count,
+            "num_bits": self.num_bits,
+            "num_hashes": self.num_hashes,
+            "size_bytes": len(self._bits),
+            "target_error_rate": self.error_rate,
+        }
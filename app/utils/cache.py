@@ -0,0 +1,201 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Small in-process LRU cache with a per-entry expiry.
+
+    Entries live for ``ttl`` seconds unless ``set`` is given an explicit
+    ``expires_at`` (epoch seconds). When full, the least recently used
+    entry is evicted. Not shared between workers.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        if self.maxsize <= 0:
+            return
+        if expires_at is None:
+            expires_at = time.time() + self.ttl
+
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        if self._data.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class SizedLRUCache:
+    """
+    In-process LRU cache bounded by the total byte size of its values
+    instead of an entry count, for payloads whose size varies a lot
+    (a leader's tree can be thousands of times bigger than a leaf's).
+
+    Each entry may carry tags; ``invalidate_tag`` drops every entry with
+    that tag. A value read before the invalidation but stored after it
+    would bring the stale data back, so ``set`` can be given the time the
+    value was read (``read_at``, from ``time.monotonic()``) and then skips
+    values read before a later invalidation of any of their tags.
+    Entries larger than ``max_entry_bytes`` are not cached, so one huge
+    payload can't flush everything else. Not shared between workers, so
+    ``ttl`` bounds staleness across them.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float = 300.0, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 8
+        self._data: "OrderedDict[Hashable, tuple[float, int, tuple, Any]]" = OrderedDict()
+        self._tags: dict[Hashable, set] = {}
+        # Last invalidation per tag (monotonic), oldest first; kept for ``ttl``
+        self._invalidated_at: "OrderedDict[Hashable, float]" = OrderedDict()
+        self.bytes = 0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.oversized = 0
+        self.stale_fills = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, _, _, value = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, size: int, tags: tuple = (), read_at: Optional[float] = None):
+        if size > self.max_entry_bytes:
+            self.oversized += 1
+            return
+        if read_at is not None and self._read_before_invalidation(read_at, tags):
+            self.stale_fills += 1
+            return
+        if key in self._data:
+            self._remove(key)
+
+        self._data[key] = (time.time() + self.ttl, size, tuple(tags), value)
+        self.bytes += size
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        _, size, tags, _ = self._data.pop(key)
+        self.bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _read_before_invalidation(self, read_at: float, tags: tuple) -> bool:
+        if time.monotonic() - read_at > self.ttl:
+            return True  # older than any invalidation record we still keep
+        return any(self._invalidated_at.get(tag, float("-inf")) >= read_at for tag in tags)
+
+    def invalidate_tag(self, tag: Hashable) -> int:
+        now = time.monotonic()
+        self._invalidated_at[tag] = now
+        self._invalidated_at.move_to_end(tag)
+        while self._invalidated_at:
+            oldest_tag, at = next(iter(self._invalidated_at.items()))
+            if now - at <= self.ttl:
+                break
+            del self._invalidated_at[oldest_tag]
+
+        keys = self._tags.get(tag)
+        if not keys:
+            return 0
+        keys = list(keys)
+        for key in keys:
+            self._remove(key)
+        self.invalidations += 1
+        return len(keys)
+
+    def clear(self):
+        self._data.clear()
+        self._tags.clear()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "oversized": self.oversized,
+            "stale_fills": self.stale_fills,
+        }
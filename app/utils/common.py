@@ -1,5 +1,6 @@
 import random
 import string
+from decimal import Decimal, ROUND_HALF_UP
 
 # -----------------------------
 # REFERRAL + TRANSACTION HELPERS
@@ -21,6 +22,11 @@ def generate_transaction_ref(prefix: str = "TX") -> str:
 
 MASTER_REFERRAL_CODE = "MASTERKEY"
 
+# Paid signup fee and the share of it paid to each upline tier (1..6) by
+# distribute_signup_bonus; the remainder goes to the MASTERKEY account.
+SIGNUP_FEE = 50
+SIGNUP_BONUS_PERCENTAGES = [0.10, 0.085, 0.07225, 0.0614, 0.0522, 0.044]
+
 # Tier reductions (relative to Tier 1)
 REFERRAL_REDUCTION_FACTORS = [1.0, 0.85, 0.70, 0.55, 0.40, 0.25]
 
@@ -38,3 +44,20 @@ def calculate_tier_bonus(signup_fee: float, tier: int, base_percentage: float =
     tier1_bonus = signup_fee * base_percentage
     reduction = REFERRAL_REDUCTION_FACTORS[tier - 1]
     return round(tier1_bonus * reduction, 2)
+
+
+# -----------------------------
+# MONEY HELPERS
+# -----------------------------
+
+MINOR_UNITS_PER_MAJOR = 100
+
+
+def to_minor_units(amount) -> int:
+    """Convert a major-unit amount ("12.34", 12.34, Decimal) to integer cents."""
+    return int((Decimal(str(amount)) * MINOR_UNITS_PER_MAJOR).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def from_minor_units(amount_minor: int) -> Decimal:
+    """Convert integer cents back to a two-decimal major-unit amount."""
+    return (Decimal(amount_minor) / MINOR_UNITS_PER_MAJOR).quantize(Decimal("0.01"))
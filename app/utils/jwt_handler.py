@@ -1,19 +1,24 @@
 from datetime import datetime, timedelta
+from uuid import uuid4
 from jose import jwt
 from app.config import settings  # ✅ use centralized config
 
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
 
+# Claims that belong to a single token and must not be carried over on rotation
+TOKEN_ONLY_CLAIMS = ("exp", "jti", "type")
+
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "type": "access"})
     return jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
 
 
 def create_refresh_token(data: dict):
     expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode = {**data, "exp": expire}
+    # 🔑 jti lets a single refresh token be revoked once it has been rotated
+    to_encode = {**data, "exp": expire, "type": "refresh", "jti": uuid4().hex}
     return jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
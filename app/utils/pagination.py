@@ -0,0 +1,50 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+
+
+def encode_cursor(position: dict) -> str:
+    """Opaque, URL-safe cursor for a keyset position."""
+    raw = json.dumps(position, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> dict:
+    """Keyset position from ``encode_cursor``; an empty dict for no cursor."""
+    if not cursor:
+        return {}
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(position, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+
+def decode_keyset_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, str]]:
+    """``(timestamp, id)`` position from a ``keyset_page`` cursor; None for no cursor."""
+    position = decode_cursor(cursor)
+    if not position:
+        return None
+    try:
+        return datetime.fromisoformat(position["at"]), str(UUID(position["id"]))
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(rows: List[Any], limit: int, time_attr: str) -> Tuple[List[Any], Optional[str]]:
+    """
+    Trim ``rows`` (fetched with ``LIMIT limit + 1``) to one page and return
+    the cursor after its last row, or None when there is no further page.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor({"at": getattr(last, time_attr).isoformat(), "id": str(last.id)})
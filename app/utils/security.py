@@ -1,7 +1,37 @@
 from passlib.context import CryptContext
 
-# Password/PIN hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.config import settings
+from app.utils.admission import AdmissionController
+from app.utils.worker_pool import BoundedWorkerPool
+
+# Password/PIN hashing context. With BCRYPT_ROUNDS set, hashes below that
+# cost are reported by needs_update() and upgraded on the next login.
+_bcrypt_options = (
+    {"bcrypt__default_rounds": settings.BCRYPT_ROUNDS, "bcrypt__min_rounds": settings.BCRYPT_ROUNDS}
+    if settings.BCRYPT_ROUNDS
+    else {}
+)
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", **_bcrypt_options)
+
+# bcrypt is CPU-bound (~200-300 ms per call), so the async variants below
+# push it onto a bounded pool instead of stalling the event loop.
+hash_pool = BoundedWorkerPool(
+    name="hash-pool",
+    kind=settings.HASH_POOL_KIND,
+    max_workers=settings.HASH_POOL_WORKERS,
+    max_queue=settings.HASH_POOL_MAX_QUEUE,
+)
+
+# Routers wrap login/registration/password/PIN handlers in this so floods
+# are turned away before they ever reach the pool.
+hash_admission = AdmissionController(
+    name="hash-admission",
+    max_concurrent=settings.HASH_ADMISSION_MAX_CONCURRENT,
+    email_rate_per_minute=settings.HASH_RATE_PER_EMAIL_PER_MINUTE,
+    email_burst=settings.HASH_BURST_PER_EMAIL,
+    ip_rate_per_minute=settings.HASH_RATE_PER_IP_PER_MINUTE,
+    ip_burst=settings.HASH_BURST_PER_IP,
+)
 
 
 def hash_password(password: str) -> str:
@@ -12,9 +42,32 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    return pwd_context.needs_update(hashed_password)
+
+
 def hash_pin(pin: str) -> str:
     return pwd_context.hash(pin)
 
 
 def verify_pin(pin: str, hashed_pin: str) -> bool:
     return pwd_context.verify(pin, hashed_pin)
+
+
+# -----------------------------
+# ASYNC VARIANTS (off the event loop)
+# -----------------------------
+async def hash_password_async(password: str) -> str:
+    return await hash_pool.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await hash_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def hash_pin_async(pin: str) -> str:
+    return await hash_pool.run(hash_pin, pin)
+
+
+async def verify_pin_async(pin: str, hashed_pin: str) -> bool:
+    return await hash_pool.run(verify_pin, pin, hashed_pin)
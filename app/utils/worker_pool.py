@@ -0,0 +1,125 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException
+
+
+def _timed_call(fn: Callable[..., Any], *args: Any):
+    """Runs inside the worker; returns when the job actually started plus its result."""
+    started_at = time.time()
+    return started_at, fn(*args)
+
+
+class BoundedWorkerPool:
+    """
+    Thread or process pool for CPU-bound work with a bounded backlog.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue`` more
+    wait for a free worker. Anything beyond that is rejected with a 503
+    instead of piling up behind the event loop.
+    """
+
+    def __init__(self, name: str, kind: str = "thread", max_workers: Optional[int] = None, max_queue: int = 64):
+        if kind not in ("thread", "process"):
+            raise ValueError("Worker pool kind must be 'thread' or 'process'")
+
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+
+    # -----------------------------
+    # Executor lifecycle
+    # -----------------------------
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=self.name
+                )
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # -----------------------------
+    # Submission
+    # -----------------------------
+    @property
+    def queue_depth(self) -> int:
+        """Jobs admitted but still waiting for a free worker."""
+        return max(0, self._in_flight - self.max_workers)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        self._in_flight += 1
+        self.submitted += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+        submitted_at = time.time()
+        loop = asyncio.get_running_loop()
+        try:
+            started_at, result = await loop.run_in_executor(
+                self._get_executor(), _timed_call, fn, *args
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+        finished_at = time.time()
+        wait = max(0.0, started_at - submitted_at)
+        self.completed += 1
+        self.wait_seconds_total += wait
+        self.wait_seconds_max = max(self.wait_seconds_max, wait)
+        self.run_seconds_total += max(0.0, finished_at - started_at)
+        return result
+
+    # -----------------------------
+    # Metrics
+    # -----------------------------
+    def stats(self) -> dict:
+        completed = self.completed or 1
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_seconds_total / completed * 1000, 3),
+            "max_wait_ms": round(self.wait_seconds_max * 1000, 3),
+            "avg_run_ms": round(self.run_seconds_total / completed * 1000, 3),
+        }
@@ -0,0 +1,130 @@
+"""baseline schema
+
+Tables as the app used them before migrations existed. Everything is
+IF NOT EXISTS, so this can be run against the existing database as well as
+an empty one.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            email TEXT NOT NULL,
+            username TEXT NOT NULL,
+            password_hash TEXT NOT NULL,
+            first_name TEXT,
+            last_name TEXT,
+            referral_code TEXT NOT NULL,
+            referred_by_code TEXT,
+            role TEXT NOT NULL DEFAULT 'user',
+            status TEXT NOT NULL DEFAULT 'active',
+            withdrawal_status TEXT NOT NULL DEFAULT 'active',
+            balance NUMERIC(14, 2) NOT NULL DEFAULT 0,
+            is_kyc_verified BOOLEAN NOT NULL DEFAULT false,
+            is_2fa_enabled BOOLEAN NOT NULL DEFAULT false,
+            has_pin BOOLEAN NOT NULL DEFAULT false,
+            withdrawal_pin_hash TEXT,
+            two_fa_secret TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            updated_at TIMESTAMPTZ
+        )
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS pending_registrations (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            email TEXT NOT NULL,
+            username TEXT NOT NULL,
+            password_hash TEXT NOT NULL,
+            first_name TEXT,
+            last_name TEXT,
+            referred_by_code TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            stripe_payment_intent_id TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            updated_at TIMESTAMPTZ,
+            expires_at TIMESTAMPTZ
+        )
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID NOT NULL REFERENCES users (id),
+            type TEXT NOT NULL,
+            amount NUMERIC(14, 2) NOT NULL,
+            currency TEXT NOT NULL DEFAULT 'gbp',
+            status TEXT NOT NULL DEFAULT 'pending',
+            reference TEXT,
+            referee_id UUID,
+            tier INTEGER,
+            note TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS withdrawals (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID NOT NULL REFERENCES users (id),
+            amount NUMERIC(14, 2) NOT NULL,
+            currency TEXT,
+            destination_address TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            admin_id UUID,
+            requested_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            processed_at TIMESTAMPTZ
+        )
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS kyc (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID NOT NULL REFERENCES users (id),
+            document_type TEXT NOT NULL,
+            address TEXT,
+            city TEXT,
+            postal_code TEXT,
+            country TEXT,
+            document_front_url TEXT,
+            document_back_url TEXT,
+            selfie_url TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            reviewed_by UUID,
+            reviewed_at TIMESTAMPTZ,
+            notes TEXT,
+            submitted_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS contacts (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            name TEXT,
+            email TEXT,
+            subject TEXT,
+            message TEXT,
+            submitted_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+
+
+def downgrade() -> None:
+    # The baseline describes pre-existing data; never drop it from here.
+    pass
@@ -0,0 +1,70 @@
+"""indexes for hot queries
+
+Built CONCURRENTLY so they can be applied to a live database. A concurrent
+build that fails leaves an INVALID index behind which ``IF NOT EXISTS``
+would then skip forever, so any such leftover is dropped before its index
+is (re)built. These are plain lookup indexes; uniqueness of the user
+identifiers is enforced separately in 0011.
+`python -m app.commands.check_query_plans` verifies the queries use them.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    # Login, registration checks, referral lookups
+    ("ix_users_email", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_email ON users (email)"),
+    ("ix_users_username", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_username ON users (username)"),
+    ("ix_users_referral_code", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_referral_code ON users (referral_code)"),
+    ("ix_users_referred_by_code", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_referred_by_code ON users (referred_by_code)"),
+    ("ix_pending_registrations_email", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_pending_registrations_email ON pending_registrations (email)"),
+    # User history lists
+    ("ix_transactions_user_created", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_user_created ON transactions (user_id, created_at DESC)"),
+    ("ix_withdrawals_user_requested", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_withdrawals_user_requested ON withdrawals (user_id, requested_at DESC)"),
+    ("ix_kyc_user_submitted", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_kyc_user_submitted ON kyc (user_id, submitted_at DESC)"),
+    # Admin queues
+    ("ix_withdrawals_status_requested", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_withdrawals_status_requested ON withdrawals (status, requested_at DESC)"),
+    ("ix_withdrawals_pending", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_withdrawals_pending ON withdrawals (requested_at DESC) WHERE status = 'pending'"),
+    ("ix_kyc_status_submitted", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_kyc_status_submitted ON kyc (status, submitted_at DESC)"),
+    ("ix_kyc_pending", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_kyc_pending ON kyc (submitted_at DESC) WHERE status = 'pending'"),
+]
+
+
+def drop_if_invalid(name: str) -> None:
+    invalid = op.get_bind().execute(
+        text("""
+            SELECT 1 FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = :name AND NOT i.indisvalid
+        """),
+        {"name": name},
+    ).scalar()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, ddl in INDEXES:
+            drop_if_invalid(name)
+            op.execute(ddl)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
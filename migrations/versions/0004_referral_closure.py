@@ -0,0 +1,59 @@
+"""referral closure table
+
+One row per (ancestor, descendant) pair in the referral graph, including a
+depth-0 row for every user. Backfilled here from users.referred_by_code and
+filled incrementally on signup from then on;
+`python -m app.commands.backfill_referral_closure` rebuilds it for repairs.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS referral_closure (
+            ancestor_id UUID NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            descendant_id UUID NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            depth INTEGER NOT NULL CHECK (depth >= 0),
+            PRIMARY KEY (ancestor_id, descendant_id)
+        )
+    """)
+    # Downline by level / team size (PK prefix covers ancestor-only lookups)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_referral_closure_ancestor_depth ON referral_closure (ancestor_id, depth)")
+    # Upline
+    op.execute("CREATE INDEX IF NOT EXISTS ix_referral_closure_descendant_depth ON referral_closure (descendant_id, depth)")
+
+    # Existing users: walk each user's referrer chain up to the root. Cycles
+    # in referred_by_code (which should not exist) are cut, not followed.
+    op.execute("""
+        INSERT INTO referral_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE chain AS (
+            SELECT u.id AS descendant_id, u.id AS ancestor_id, 0 AS depth,
+                   u.referred_by_code AS next_code, ARRAY[u.id] AS path
+            FROM users u
+            UNION ALL
+            SELECT c.descendant_id, p.id, c.depth + 1, p.referred_by_code, c.path || p.id
+            FROM chain c
+            JOIN users p ON p.referral_code = c.next_code
+            WHERE NOT p.id = ANY(c.path)
+        )
+        SELECT ancestor_id, descendant_id, depth FROM chain
+        ON CONFLICT (ancestor_id, descendant_id) DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS referral_closure")
@@ -0,0 +1,79 @@
+"""append-only ledger
+
+Every balance movement is one ledger_entries row in integer minor units that
+carries the user's resulting balance and lifetime earnings, so both are read
+from the latest entry. UPDATE and DELETE are rejected by a trigger.
+
+Existing balances are carried over as one 'opening' entry per user; lifetime
+earnings start from the user's referral_bonus and admin_credit history.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS ledger_entries (
+            id BIGSERIAL PRIMARY KEY,
+            user_id UUID NOT NULL REFERENCES users (id),
+            entry_type TEXT NOT NULL,
+            amount_minor BIGINT NOT NULL,
+            balance_after_minor BIGINT NOT NULL,
+            lifetime_earnings_minor BIGINT NOT NULL,
+            transaction_id UUID,
+            withdrawal_id UUID,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    # Latest entry per user
+    op.execute("CREATE INDEX IF NOT EXISTS ix_ledger_entries_user_id_id ON ledger_entries (user_id, id DESC)")
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION ledger_entries_append_only() RETURNS trigger AS $$
+        BEGIN
+            RAISE EXCEPTION 'ledger_entries is append-only';
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS ledger_entries_append_only ON ledger_entries")
+    op.execute("""
+        CREATE TRIGGER ledger_entries_append_only
+        BEFORE UPDATE OR DELETE ON ledger_entries
+        FOR EACH ROW EXECUTE FUNCTION ledger_entries_append_only()
+    """)
+
+    # Opening entries for existing users
+    op.execute("""
+        INSERT INTO ledger_entries (user_id, entry_type, amount_minor, balance_after_minor, lifetime_earnings_minor)
+        SELECT u.id,
+               'opening',
+               ROUND(COALESCE(u.balance, 0) * 100)::bigint,
+               ROUND(COALESCE(u.balance, 0) * 100)::bigint,
+               COALESCE(e.earned_minor, 0)
+        FROM users u
+        LEFT JOIN (
+            SELECT user_id, ROUND(SUM(amount) * 100)::bigint AS earned_minor
+            FROM transactions
+            WHERE type IN ('referral_bonus', 'admin_credit')
+            GROUP BY user_id
+        ) e ON e.user_id = u.id
+        WHERE NOT EXISTS (SELECT 1 FROM ledger_entries le WHERE le.user_id = u.id)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS ledger_entries")
+    op.execute("DROP FUNCTION IF EXISTS ledger_entries_append_only()")
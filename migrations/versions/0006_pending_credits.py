@@ -0,0 +1,43 @@
+"""pending hot-account credits
+
+Credits to hot accounts (HOT_ACCOUNT_MODE) are appended here under a random
+shard and folded into ledger_entries in batches by the app.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS pending_credits (
+            id BIGSERIAL PRIMARY KEY,
+            shard SMALLINT NOT NULL,
+            user_id UUID NOT NULL REFERENCES users (id),
+            entry_type TEXT NOT NULL,
+            amount_minor BIGINT NOT NULL CHECK (amount_minor > 0),
+            earning_minor BIGINT NOT NULL,
+            transaction_id UUID,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    # Folder drains one shard at a time, oldest first
+    op.execute("CREATE INDEX IF NOT EXISTS ix_pending_credits_shard_id ON pending_credits (shard, id)")
+    # Unfolded credits added to balance reads
+    op.execute("CREATE INDEX IF NOT EXISTS ix_pending_credits_user_id ON pending_credits (user_id)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS pending_credits")
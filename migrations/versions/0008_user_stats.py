@@ -0,0 +1,70 @@
+"""per-user counters
+
+One row per user with direct referrals, total team size, lifetime bonus
+earnings and pending withdrawals, maintained by the app in the same
+transaction as the change they count. Backfilled from referral_closure,
+ledger_entries and withdrawals.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS user_stats (
+            user_id UUID PRIMARY KEY REFERENCES users (id) ON DELETE CASCADE,
+            direct_referrals INTEGER NOT NULL DEFAULT 0,
+            total_team_size INTEGER NOT NULL DEFAULT 0,
+            lifetime_earnings_minor BIGINT NOT NULL DEFAULT 0,
+            pending_withdrawals_minor BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+
+    op.execute("""
+        INSERT INTO user_stats (user_id, direct_referrals, total_team_size, lifetime_earnings_minor, pending_withdrawals_minor)
+        SELECT u.id,
+               COALESCE(team.direct_referrals, 0),
+               COALESCE(team.total_team_size, 0),
+               COALESCE(le.lifetime_earnings_minor, 0),
+               COALESCE(wd.pending_minor, 0)
+        FROM users u
+        LEFT JOIN (
+            SELECT ancestor_id,
+                   COUNT(*) FILTER (WHERE depth = 1) AS direct_referrals,
+                   COUNT(*) FILTER (WHERE depth >= 1) AS total_team_size
+            FROM referral_closure
+            GROUP BY ancestor_id
+        ) team ON team.ancestor_id = u.id
+        LEFT JOIN LATERAL (
+            SELECT lifetime_earnings_minor
+            FROM ledger_entries
+            WHERE user_id = u.id
+            ORDER BY id DESC
+            LIMIT 1
+        ) le ON true
+        LEFT JOIN (
+            SELECT user_id, ROUND(SUM(amount) * 100)::bigint AS pending_minor
+            FROM withdrawals
+            WHERE status = 'pending'
+            GROUP BY user_id
+        ) wd ON wd.user_id = u.id
+        ON CONFLICT (user_id) DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS user_stats")
@@ -0,0 +1,43 @@
+"""daily rollups
+
+Per-day counts and volumes per metric and currency (signups, referral
+bonuses, admin credits, withdrawal requests and approvals), upserted by the
+app in the same transaction as the rows they count. Each key is spread over
+a few shard rows so concurrent writers don't queue on one row per day;
+readers sum the shards. Existing history is backfilled with
+``python -m app.commands.rebuild_daily_rollups``.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            day DATE NOT NULL,
+            metric TEXT NOT NULL,
+            currency TEXT NOT NULL,
+            shard SMALLINT NOT NULL DEFAULT 0,
+            count BIGINT NOT NULL DEFAULT 0,
+            amount_minor BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (day, metric, currency, shard)
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS daily_rollups")
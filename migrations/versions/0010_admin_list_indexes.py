@@ -0,0 +1,81 @@
+"""keyset indexes for the admin lists
+
+(time, id) composite indexes behind the cursor-paginated admin lists of
+users, transactions and withdrawals: one for the unfiltered list and one
+per equality filter, so every page is an index range scan from the cursor.
+Supersedes the (user_id, time) and (status, requested_at) indexes from 0003,
+which the new ones cover. Like 0003, any INVALID leftover of a failed
+concurrent build is dropped before its index is (re)built.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    # Users
+    ("ix_users_created_id", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_created_id ON users (created_at DESC, id DESC)"),
+    ("ix_users_status_created_id", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_status_created_id ON users (status, created_at DESC, id DESC)"),
+    ("ix_users_role_created_id", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_role_created_id ON users (role, created_at DESC, id DESC)"),
+    ("ix_users_referred_by_created_id", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_referred_by_created_id ON users (referred_by_code, created_at DESC, id DESC)"),
+    # Transactions
+    ("ix_transactions_created_id", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_created_id ON transactions (created_at DESC, id DESC)"),
+    ("ix_transactions_type_created_id", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_type_created_id ON transactions (type, created_at DESC, id DESC)"),
+    ("ix_transactions_status_created_id", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_status_created_id ON transactions (status, created_at DESC, id DESC)"),
+    ("ix_transactions_user_created_id", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_user_created_id ON transactions (user_id, created_at DESC, id DESC)"),
+    # Withdrawals
+    ("ix_withdrawals_requested_id", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_withdrawals_requested_id ON withdrawals (requested_at DESC, id DESC)"),
+    ("ix_withdrawals_status_requested_id", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_withdrawals_status_requested_id ON withdrawals (status, requested_at DESC, id DESC)"),
+    ("ix_withdrawals_user_requested_id", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_withdrawals_user_requested_id ON withdrawals (user_id, requested_at DESC, id DESC)"),
+]
+
+# Prefixes of the indexes above, dropped once those exist
+SUPERSEDED = [
+    ("ix_transactions_user_created", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_user_created ON transactions (user_id, created_at DESC)"),
+    ("ix_withdrawals_user_requested", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_withdrawals_user_requested ON withdrawals (user_id, requested_at DESC)"),
+    ("ix_withdrawals_status_requested", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_withdrawals_status_requested ON withdrawals (status, requested_at DESC)"),
+]
+
+
+def drop_if_invalid(name: str) -> None:
+    invalid = op.get_bind().execute(
+        text("""
+            SELECT 1 FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = :name AND NOT i.indisvalid
+        """),
+        {"name": name},
+    ).scalar()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, ddl in INDEXES:
+            drop_if_invalid(name)
+            op.execute(ddl)
+        for name, _ in SUPERSEDED:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, ddl in SUPERSEDED:
+            drop_if_invalid(name)
+            op.execute(ddl)
+        for name, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,82 @@
+"""unique user identifiers
+
+Enforces uniqueness of users.email, users.username and users.referral_code
+with unique indexes, which the registration checks and referral lookups
+assume but the baseline schema never guaranteed. They replace the plain
+lookup indexes from 0003.
+
+Existing duplicates would make a concurrent unique build fail halfway and
+leave an INVALID index, so the upgrade checks for them first and stops with
+the offending values listed; resolve those rows and re-run. INVALID
+leftovers of an earlier failed attempt are dropped before building.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (column, unique index, plain 0003 index it replaces)
+COLUMNS = [
+    ("email", "ux_users_email", "ix_users_email"),
+    ("username", "ux_users_username", "ix_users_username"),
+    ("referral_code", "ux_users_referral_code", "ix_users_referral_code"),
+]
+
+
+def drop_if_invalid(name: str) -> None:
+    invalid = op.get_bind().execute(
+        text("""
+            SELECT 1 FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = :name AND NOT i.indisvalid
+        """),
+        {"name": name},
+    ).scalar()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    duplicates = {}
+    for column, _, _ in COLUMNS:
+        rows = bind.execute(text(f"""
+            SELECT {column} AS value, COUNT(*) AS n
+            FROM users
+            WHERE {column} IS NOT NULL
+            GROUP BY {column}
+            HAVING COUNT(*) > 1
+            ORDER BY n DESC
+            LIMIT 10
+        """)).fetchall()
+        if rows:
+            duplicates[column] = [f"{r.value!r} x{r.n}" for r in rows]
+    if duplicates:
+        details = "; ".join(f"{column}: {', '.join(values)}" for column, values in duplicates.items())
+        raise RuntimeError(f"Duplicate user identifiers, resolve them before upgrading: {details}")
+
+    with op.get_context().autocommit_block():
+        for column, unique_name, plain_name in COLUMNS:
+            drop_if_invalid(unique_name)
+            op.execute(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {unique_name} ON users ({column})")
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {plain_name}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for column, unique_name, plain_name in reversed(COLUMNS):
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {plain_name} ON users ({column})")
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {unique_name}")
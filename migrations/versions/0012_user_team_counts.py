@@ -0,0 +1,67 @@
+"""sharded team counters
+
+Moves direct referrals and total team size out of user_stats into
+user_team_counts, where each user's counters are spread over a few shard
+rows: a signup adds to one random shard of every ancestor instead of
+locking the single user_stats row of each, so signups under the same
+top-of-tree account no longer queue behind each other. Readers sum the
+shards. Backfilled from referral_closure.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0012"
+down_revision: Union[str, None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS user_team_counts (
+            user_id UUID NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            shard SMALLINT NOT NULL DEFAULT 0,
+            direct_referrals INTEGER NOT NULL DEFAULT 0,
+            total_team_size INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, shard)
+        )
+    """)
+
+    op.execute("""
+        INSERT INTO user_team_counts (user_id, shard, direct_referrals, total_team_size)
+        SELECT ancestor_id, 0,
+               COUNT(*) FILTER (WHERE depth = 1),
+               COUNT(*) FILTER (WHERE depth >= 1)
+        FROM referral_closure
+        WHERE depth >= 1
+        GROUP BY ancestor_id
+        ON CONFLICT (user_id, shard) DO NOTHING
+    """)
+
+    op.execute("ALTER TABLE user_stats DROP COLUMN IF EXISTS direct_referrals")
+    op.execute("ALTER TABLE user_stats DROP COLUMN IF EXISTS total_team_size")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE user_stats ADD COLUMN IF NOT EXISTS direct_referrals INTEGER NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE user_stats ADD COLUMN IF NOT EXISTS total_team_size INTEGER NOT NULL DEFAULT 0")
+    op.execute("""
+        UPDATE user_stats s
+        SET direct_referrals = t.direct_referrals,
+            total_team_size = t.total_team_size
+        FROM (
+            SELECT user_id, SUM(direct_referrals) AS direct_referrals, SUM(total_team_size) AS total_team_size
+            FROM user_team_counts
+            GROUP BY user_id
+        ) t
+        WHERE s.user_id = t.user_id
+    """)
+    op.execute("DROP TABLE IF EXISTS user_team_counts")
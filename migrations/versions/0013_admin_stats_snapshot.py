@@ -0,0 +1,36 @@
+"""admin stats snapshot
+
+Single-row table holding the latest admin dashboard aggregates. One worker
+at a time recomputes it (under an advisory lock) and every worker serves
+the stored row, so the scans run once per refresh interval for the whole
+deployment and all workers report the same ``as_of``.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0013"
+down_revision: Union[str, None] = "0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS admin_stats_snapshot (
+            id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+            data JSONB NOT NULL,
+            as_of TIMESTAMPTZ NOT NULL
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS admin_stats_snapshot")